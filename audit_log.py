@@ -0,0 +1,184 @@
+import argparse
+import atexit
+import functools
+import json
+import numbers
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+DEFAULT_AUDIT_DB = 'prediction_audit.sqlite'
+# A group commit happens once this many rows are waiting or the oldest has
+# waited this long
+FLUSH_ROWS = 5000
+FLUSH_INTERVAL = 0.5
+# record() only blocks once the writer is this many batches behind, which
+# bounds the memory held by a fast batch job
+MAX_PENDING = 16
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS feature_sets (id INTEGER PRIMARY KEY, columns TEXT UNIQUE)",
+    "CREATE TABLE IF NOT EXISTS predictions ("
+    "seq INTEGER PRIMARY KEY, patient_id TEXT, timestamp TEXT, model_sha256 TEXT, "
+    "probability REAL, prediction INTEGER, feature_set INTEGER, features TEXT)",
+    "CREATE INDEX IF NOT EXISTS predictions_patient ON predictions (patient_id)",
+    # Append-only: rows can be added, never changed or removed
+    "CREATE TRIGGER IF NOT EXISTS predictions_no_update BEFORE UPDATE ON predictions "
+    "BEGIN SELECT RAISE(ABORT, 'the audit log is append-only'); END",
+    "CREATE TRIGGER IF NOT EXISTS predictions_no_delete BEFORE DELETE ON predictions "
+    "BEGIN SELECT RAISE(ABORT, 'the audit log is append-only'); END",
+]
+
+
+def connect(path):
+    db = sqlite3.connect(path, timeout=30)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    with db:
+        for statement in SCHEMA:
+            db.execute(statement)
+    return db
+
+
+class AuditLog:
+    # Every prediction with the encoded features, probability, decision,
+    # model hash and time. record() only puts the batch on a queue; a writer
+    # thread converts and group-commits it, so the predict path never waits
+    # on SQLite.
+    def __init__(self, path=DEFAULT_AUDIT_DB, flush_rows=FLUSH_ROWS, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        connect(path).close()
+        self._queue = queue.Queue(MAX_PENDING)
+        self._writer = threading.Thread(target=self._write, daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def record(self, model_sha256, patient_ids, features, probabilities, predictions):
+        # features is the encoded frame the model scored; patient_ids may be
+        # None when the input has no id column
+        timestamp = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+        self._queue.put((len(features), (timestamp, model_sha256, patient_ids, features, probabilities,
+                                         predictions)))
+
+    def for_model(self, model_sha256):
+        # What the scorers take as audit=: record(patient_ids, features,
+        # probabilities, predictions) for one model
+        return functools.partial(self.record, model_sha256)
+
+    def flush(self):
+        # Blocks until everything recorded so far is committed
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def _write(self):
+        db = connect(self.path)
+        feature_sets = dict(db.execute("SELECT columns, id FROM feature_sets"))
+        running = True
+        while running:
+            batches, waiting, rows = [self._queue.get()], [], 0
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                item = batches[-1]
+                if item is None:
+                    running = False
+                    batches.pop()
+                    break
+                if isinstance(item, threading.Event):
+                    waiting.append(batches.pop())
+                    break
+                rows += item[0]
+                if rows >= self.flush_rows:
+                    break
+                try:
+                    batches.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                if batches:
+                    with db:
+                        db.executemany("INSERT INTO predictions (patient_id, timestamp, model_sha256, probability, "
+                                       "prediction, feature_set, features) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                       [row for _, batch in batches for row in _rows(db, feature_sets, *batch)])
+            except Exception as e:
+                # A failed write or a batch that can't be converted loses only
+                # these rows; the writer keeps running so record() and flush()
+                # never hang. Feature set ids may have been rolled back.
+                feature_sets.clear()
+                print(f"⚠️ Audit log write of {rows} rows to {self.path} failed: {e!r}")
+            finally:
+                for done in waiting:
+                    done.set()
+        db.close()
+
+
+def patient_key(value):
+    # Stored form of a patient id. pandas reads an id column with blanks as
+    # float, so integral floats are stored as integers ('1', not '1.0') and
+    # blanks as NULL; lookup() normalizes its argument the same way.
+    if pd.isna(value):
+        return None
+    if isinstance(value, numbers.Real) and not isinstance(value, numbers.Integral) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _rows(db, feature_sets, timestamp, model_sha256, patient_ids, features, probabilities, predictions):
+    # Feature names are stored once per column layout; each row keeps only
+    # its values as a JSON array
+    columns = json.dumps(list(features.columns))
+    if columns not in feature_sets:
+        db.execute("INSERT OR IGNORE INTO feature_sets (columns) VALUES (?)", (columns,))
+        feature_sets[columns] = db.execute("SELECT id FROM feature_sets WHERE columns = ?", (columns,)).fetchone()[0]
+    values = zip(*(features[name].tolist() for name in features.columns))
+    ids = [None] * len(features) if patient_ids is None else [patient_key(i) for i in patient_ids]
+    for patient_id, row, probability, prediction in zip(ids, values, probabilities.tolist(), predictions.tolist()):
+        yield (patient_id, timestamp, model_sha256, probability, prediction, feature_sets[columns],
+               json.dumps(row))
+
+
+def lookup(path, patient_id):
+    # Every prediction for one patient, oldest first; served by the index
+    db = sqlite3.connect(path)
+    try:
+        feature_sets = {set_id: json.loads(columns)
+                        for set_id, columns in db.execute("SELECT id, columns FROM feature_sets")}
+        rows = db.execute("SELECT seq, timestamp, model_sha256, probability, prediction, feature_set, features "
+                          "FROM predictions WHERE patient_id = ? ORDER BY seq", (patient_key(patient_id),)).fetchall()
+    finally:
+        db.close()
+    return [{'seq': seq, 'patient_id': patient_key(patient_id), 'timestamp': timestamp, 'model_sha256': model_sha256,
+             'probability': probability, 'prediction': prediction,
+             'features': dict(zip(feature_sets[feature_set], json.loads(features)))}
+            for seq, timestamp, model_sha256, probability, prediction, feature_set, features in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up recorded predictions")
+    parser.add_argument('patient_id')
+    parser.add_argument('--db', default=DEFAULT_AUDIT_DB, help="Audit log written by the scorers and the GUI")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    entries = lookup(args.db, args.patient_id)
+    print(f"🔎 {len(entries)} predictions for patient {args.patient_id} "
+          f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+    for entry in entries:
+        print(f"{entry['timestamp']}  model {entry['model_sha256'][:12]}  "
+              f"probability {entry['probability']:.3f}  prediction {entry['prediction']}")
+        print(f"    {entry['features']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import argparse
+import hashlib
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from calibration import IDENTITY, load_calibration
+from feature_schema import load_schema, model_schema
+from metrics import METRICS, increment, timed, timer
+from prediction_cache import PredictionCache, row_keys
+from preprocessing import load_preprocessing, preprocess_checked
+
+DEFAULT_MODEL_PATH = 'lung_cancer_survival_model.cbm'
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def load_model(path=DEFAULT_MODEL_PATH, blob=None):
+    # .npz files are compiled models (see compiled_model.py) and don't need
+    # the catboost runtime at all. model.sha256 identifies the bytes actually
+    # loaded, for the prediction cache and the audit log.
+    if blob is None:
+        with open(path, 'rb') as f:
+            blob = f.read()
+    if path.endswith('.npz'):
+        from compiled_model import CompiledModel
+        model = CompiledModel.from_bytes(blob)
+        # Compiled models answer for the .cbm they were exported from
+        model.sha256 = model.source_sha256 or hashlib.sha256(blob).hexdigest()
+    else:
+        from catboost import CatBoostClassifier
+        model = CatBoostClassifier()
+        model.load_model(blob=blob)
+        model.sha256 = hashlib.sha256(blob).hexdigest()
+    # A model trained on other columns or categories fails here, not mid-batch;
+    # the schema stays with the model so every scorer encodes through it
+    model.feature_schema = load_schema(path)
+    model.feature_schema.validate(model)
+    return model
+
+
+def predict_probabilities(model, features, cache=None, thread_count=-1):
+    # Only distinct feature rows missing from the cache reach the model;
+    # results are scattered back to every original row
+    with timer('deduplication'):
+        keys = row_keys(features)
+        unique_keys, first_rows, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    with timer('cache_lookup'):
+        if cache is not None:
+            unique_probabilities = cache.get_many(unique_keys)
+        else:
+            unique_probabilities = np.full(len(unique_keys), np.nan)
+
+    missing = np.flatnonzero(np.isnan(unique_probabilities))
+    increment('rows_scored', len(features))
+    if len(missing):
+        with timer('model_call'):
+            scored = model.predict_proba(features.iloc[first_rows[missing]],
+                                         thread_count=thread_count)[:, 1]
+        unique_probabilities[missing] = scored
+        if cache is not None:
+            cache.put_many(unique_keys[missing], scored)
+    return unique_probabilities[inverse]
+
+
+def add_decisions(result, probabilities, calibration=IDENTITY):
+    # The cache holds raw probabilities; calibration and the operating
+    # threshold are applied to the whole batch afterwards
+    with timer('calibration'):
+        calibrated = calibration.apply(probabilities)
+        result['prediction'] = calibration.decide(calibrated)
+        result['probability'] = calibrated
+    return result
+
+
+def audit_scored(audit, ids, features, result):
+    # Hands the batch to the audit log's writer thread (see audit_log.py)
+    audit(ids, features, result['probability'].to_numpy(), result['prediction'].to_numpy())
+
+
+def score_features(model, features, errors, ids=None, thread_count=-1, cache=None, calibration=IDENTITY,
+                   monitor=None, audit=None):
+    # Valid rows are scored with one model call. Rows with a validation
+    # error (see preprocessing.row_errors) keep the message in 'error' and
+    # get no prediction; they are neither monitored nor audited.
+    valid = (errors == '').to_numpy()
+    scored = features if valid.all() else features[valid]
+    probabilities = predict_probabilities(model, scored, cache, thread_count)
+    if monitor is not None and len(scored):
+        monitor.update(scored)
+    decisions = add_decisions(pd.DataFrame(index=scored.index), probabilities, calibration)
+    result = pd.DataFrame(index=features.index)
+    if ids is not None:
+        result['id'] = ids
+    result['prediction'] = decisions['prediction'].astype('Int8')
+    result['probability'] = decisions['probability']
+    result['error'] = errors
+    if audit is not None:
+        audit_scored(audit, ids[valid] if ids is not None else None, scored, decisions)
+    return result
+
+
+def score_frame(model, raw, imputation=None, thread_count=-1, cache=None, calibration=IDENTITY,
+                monitor=None, audit=None):
+    # Score a whole chunk with one model call
+    features, errors = preprocess_checked(raw, imputation, schema=model_schema(model))
+    ids = raw['id'].to_numpy() if 'id' in raw.columns else None
+    return score_features(model, features, errors, ids, thread_count, cache, calibration, monitor, audit)
+
+
+def score_csv(model, input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, imputation=None,
+              cache=None, calibration=IDENTITY, monitor=None, audit=None):
+    # Stream the input so memory stays flat regardless of file size
+    total_rows = 0
+    start = time.perf_counter()
+    reader = pd.read_csv(input_path, chunksize=chunk_size)
+    for chunk_number, chunk in enumerate(timed(reader, 'csv_read')):
+        result = score_frame(model, chunk, imputation, cache=cache, calibration=calibration,
+                             monitor=monitor, audit=audit)
+        with timer('csv_write'):
+            result.to_csv(output_path, mode='w' if chunk_number == 0 else 'a',
+                          header=chunk_number == 0, index=False)
+        total_rows += len(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"📦 Chunk {chunk_number + 1}: {total_rows} rows scored "
+              f"({total_rows / elapsed:,.0f} rows/sec)")
+        report_invalid(result)
+    return total_rows
+
+
+def report_invalid(result):
+    invalid = int((result['error'] != '').sum())
+    if invalid:
+        print(f"⚠️ {invalid} rows failed validation and were not scored (see the error column)")
+
+
+def score_store(model, store, output_path, chunk_size=DEFAULT_CHUNK_SIZE, cache=None,
+                calibration=IDENTITY, monitor=None, audit=None):
+    # Score an already encoded and imputed compact store (see dataset_cache.py)
+    for start in range(0, len(store), chunk_size):
+        rows = slice(start, start + chunk_size)
+        with timer('dataframe_construction'):
+            features = store.frame(rows)
+        result = score_features(model, features, store.row_errors(rows),
+                                store.ids[rows] if store.ids is not None else None,
+                                cache=cache, calibration=calibration, monitor=monitor, audit=audit)
+        report_invalid(result)
+        with timer('csv_write'):
+            result.to_csv(output_path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    return len(store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV of patients with the survival model")
+    parser.add_argument('input', help="CSV with the same fields the GUI form collects")
+    parser.add_argument('output', help="CSV to write predictions and probabilities to")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="CatBoost model file")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Rows read and scored per model call")
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help="Keep this many distinct feature rows in an in-memory LRU cache")
+    parser.add_argument('--cache-db', help="SQLite file for a persistent prediction cache")
+    parser.add_argument('--dataset-cache', metavar='DIR',
+                        help="Parse the CSV once into memory-mapped columns here and reuse them")
+    parser.add_argument('--registry', metavar='DIR', help="Score with the registry's current model")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="Write stage timings here (.prom for Prometheus text, otherwise JSON)")
+    parser.add_argument('--drift', metavar='PATH',
+                        help="Compare the scored rows with the model's training profile and write "
+                             "per-feature PSI/KS scores here (JSON)")
+    parser.add_argument('--audit-db', metavar='PATH',
+                        help="Append every prediction to this audit log (see audit_log.py)")
+    args = parser.parse_args()
+
+    if args.registry:
+        from model_registry import ModelRegistry
+
+        registry = ModelRegistry(args.registry)
+        if registry.current() is None:
+            parser.error(f"No current model in {args.registry}")
+        args.model = registry.model_path(registry.current())
+    model = load_model(args.model)
+    imputation = load_preprocessing(args.model)
+    calibration = load_calibration(args.model)
+    monitor = None
+    if args.drift:
+        from drift import DriftMonitor, load_profile
+
+        profile = load_profile(args.model)
+        if profile is None:
+            parser.error(f"No reference profile next to {args.model}; retrain to create one")
+        monitor = DriftMonitor(profile)
+    audit_log = audit = None
+    if args.audit_db:
+        from audit_log import AuditLog
+
+        audit_log = AuditLog(args.audit_db)
+        audit = audit_log.for_model(model.sha256)
+    cache = None
+    if args.cache_size or args.cache_db:
+        cache = PredictionCache(model.sha256, args.cache_size or DEFAULT_CHUNK_SIZE, args.cache_db)
+    start = time.perf_counter()
+    if args.dataset_cache:
+        from dataset_cache import load_or_build
+
+        store, _, hit = load_or_build(args.input, args.dataset_cache, args.chunk_size,
+                                      model_schema(model))
+        print(f"🗃️ Dataset cache {'hit' if hit else 'miss'} in {args.dataset_cache}")
+        store.impute(imputation)
+        total_rows = score_store(model, store, args.output, args.chunk_size, cache, calibration, monitor,
+                                 audit)
+    else:
+        total_rows = score_csv(model, args.input, args.output, args.chunk_size, imputation, cache,
+                               calibration, monitor, audit)
+    if audit_log is not None:
+        audit_log.close()
+    elapsed = time.perf_counter() - start
+    print(f"✅ Scored {total_rows} rows in {elapsed:.2f}s -> {args.output}")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"🗃️ Cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.1%} hit rate)")
+        cache.close()
+    if monitor is not None:
+        monitor.report()
+        with open(args.drift, 'w') as f:
+            json.dump(monitor.scores(), f, indent=2)
+    METRICS.report()
+    if args.metrics:
+        METRICS.export(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
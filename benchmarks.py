@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from batch_predict import load_model
+from preprocessing import fit_imputation, preprocess, save_preprocessing
+from synthetic_data import make_patients
+
+DEFAULT_RESULTS = 'benchmark_results.json'
+DEFAULT_BATCH_SIZES = [1, 64, 1024, 16384, 100_000]
+DEFAULT_THRESHOLD = 0.25
+
+
+def best_of(function, repeats):
+    # Shortest of several runs; the minimum is the least noisy estimate
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def metric(value, unit, higher_is_better=False):
+    return {'value': round(value, 6), 'unit': unit, 'higher_is_better': higher_is_better}
+
+
+def bench_training(raw, imputation, iterations, output_path):
+    # Fits the benchmark model and reports the cost of one boosting iteration
+    from catboost import CatBoostClassifier, Pool
+    from preprocessing import CATEGORICAL_COLUMNS
+    from train_model import MODEL_PARAMS
+
+    pool = Pool(preprocess(raw, imputation), raw['survived'], cat_features=CATEGORICAL_COLUMNS)
+    model = CatBoostClassifier(**{**MODEL_PARAMS, 'iterations': iterations}, verbose=0)
+    start = time.perf_counter()
+    model.fit(pool)
+    seconds = time.perf_counter() - start
+    model.save_model(output_path)
+    save_preprocessing(imputation, output_path)
+    return {'train_ms_per_iteration': metric(seconds / iterations * 1000, 'ms')}
+
+
+def bench_model_load(model_path, repeats):
+    seconds = best_of(lambda: load_model(model_path), repeats)
+    return {'model_load_ms': metric(seconds * 1000, 'ms')}
+
+
+def bench_preprocessing(raw, imputation, repeats):
+    seconds = best_of(lambda: preprocess(raw, imputation), repeats)
+    return {'preprocess_rows_per_sec': metric(len(raw) / seconds, 'rows/s', higher_is_better=True)}
+
+
+def bench_single_row(model, raw, imputation, samples):
+    # One patient at a time, as the GUI and /predict see them: preprocessing
+    # plus a model call per row
+    latencies, model_latencies = [], []
+    for i in range(samples):
+        row = raw.iloc[[i % len(raw)]]
+        start = time.perf_counter()
+        features = preprocess(row, imputation)
+        scored = time.perf_counter()
+        model.predict_proba(features)
+        end = time.perf_counter()
+        latencies.append(end - start)
+        model_latencies.append(end - scored)
+    latencies = np.array(latencies) * 1000
+    return {
+        'single_row_p50_ms': metric(float(np.percentile(latencies, 50)), 'ms'),
+        'single_row_p99_ms': metric(float(np.percentile(latencies, 99)), 'ms'),
+        'single_row_model_p50_ms': metric(float(np.median(model_latencies)) * 1000, 'ms'),
+    }
+
+
+def bench_batches(model, features, batch_sizes, repeats):
+    results = {}
+    for batch_size in batch_sizes:
+        if batch_size > len(features):
+            continue
+        batch = features.iloc[:batch_size]
+        seconds = best_of(lambda: model.predict_proba(batch), repeats)
+        results[f'batch_{batch_size}_rows_per_sec'] = metric(batch_size / seconds, 'rows/s',
+                                                             higher_is_better=True)
+    return results
+
+
+def run_suite(rows, train_rows, iterations, batch_sizes, repeats, model_path=None):
+    raw = make_patients(max(rows, train_rows))
+    imputation = fit_imputation(raw)
+    metrics = {}
+    with tempfile.TemporaryDirectory() as directory:
+        trained_path = os.path.join(directory, 'benchmark_model.cbm')
+        print(f"🚀 Training {iterations} iterations on {train_rows} rows")
+        metrics.update(bench_training(raw.iloc[:train_rows], imputation, iterations, trained_path))
+
+        # Inference runs against --model when given, otherwise the model just trained
+        model_path = model_path or trained_path
+        print(f"📂 Loading {model_path}")
+        metrics.update(bench_model_load(model_path, repeats))
+        model = load_model(model_path)
+
+        print(f"🧹 Preprocessing {rows} rows")
+        metrics.update(bench_preprocessing(raw.iloc[:rows], imputation, repeats))
+        print("⏱️ Single-row latency")
+        metrics.update(bench_single_row(model, raw, imputation, samples=200))
+        print(f"📦 Batch throughput at {batch_sizes}")
+        features = preprocess(raw.iloc[:rows], imputation)
+        metrics.update(bench_batches(model, features, batch_sizes, repeats))
+    return metrics
+
+
+def environment():
+    import catboost
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'catboost': catboost.__version__,
+    }
+
+
+def compare(metrics, baseline, threshold):
+    # Metrics that moved the wrong way by more than threshold (a fraction)
+    regressions = []
+    for name, current in metrics.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['value'], current['value']
+        change = (after - before) / before if before else 0.0
+        worse = -change if current['higher_is_better'] else change
+        if worse > threshold:
+            regressions.append((name, before, after, worse))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark training and inference on synthetic patients")
+    parser.add_argument('--model', help="Model to benchmark inference with (default: the one trained here)")
+    parser.add_argument('--rows', type=int, default=100_000, help="Rows for preprocessing and batch throughput")
+    parser.add_argument('--train-rows', type=int, default=50_000)
+    parser.add_argument('--iterations', type=int, default=100, help="Boosting iterations for the training benchmark")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', default=DEFAULT_RESULTS, help="JSON file to write results to")
+    parser.add_argument('--baseline', help="Earlier results to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Fail when a metric is this fraction worse than the baseline")
+    args = parser.parse_args()
+
+    metrics = run_suite(args.rows, args.train_rows, args.iterations, args.batch_sizes,
+                        args.repeats, args.model)
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'metrics': metrics}, f, indent=2)
+    for name, result in metrics.items():
+        print(f"{name:>32}: {result['value']:>14,.3f} {result['unit']}")
+    print(f"💾 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['metrics']
+        regressions = compare(metrics, baseline, args.threshold)
+        for name, before, after, worse in regressions:
+            print(f"❌ {name}: {before:,.3f} -> {after:,.3f} ({worse:.0%} worse)")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No metric regressed more than {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.5
+EPSILON = 1e-6
+
+
+def calibration_path(model_path):
+    return os.path.splitext(model_path)[0] + '_calibration.npz'
+
+
+def _logit(probabilities):
+    probabilities = np.clip(probabilities, EPSILON, 1 - EPSILON)
+    return np.log(probabilities / (1 - probabilities))
+
+
+class Calibration:
+    # Maps raw model probabilities to calibrated ones and holds the operating
+    # threshold. Isotonic maps are stored as breakpoints and applied with
+    # np.interp; Platt scaling is a sigmoid over the raw logit.
+    def __init__(self, method, x=None, y=None, coef=None, threshold=DEFAULT_THRESHOLD):
+        self.method = method
+        self.x = x
+        self.y = y
+        self.coef = coef
+        self.threshold = threshold
+
+    def apply(self, probabilities):
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        if self.method == 'isotonic':
+            return np.interp(probabilities, self.x, self.y)
+        if self.method == 'platt':
+            slope, intercept = self.coef
+            return 1 / (1 + np.exp(-(slope * _logit(probabilities) + intercept)))
+        return probabilities
+
+    def decide(self, calibrated):
+        return (calibrated >= self.threshold).astype('int8')
+
+    def save(self, model_path):
+        arrays = {'method': np.array(self.method), 'threshold': np.array(self.threshold)}
+        for name in ('x', 'y', 'coef'):
+            if getattr(self, name) is not None:
+                arrays[name] = getattr(self, name)
+        with open(calibration_path(model_path), 'wb') as f:
+            np.savez(f, **arrays)
+
+
+# Used when a model has no calibration file: raw probabilities, 0.5 cut
+IDENTITY = Calibration('none')
+
+
+def load_calibration(model_path):
+    path = calibration_path(model_path)
+    if not os.path.exists(path):
+        return IDENTITY
+    with np.load(path) as arrays:
+        return Calibration(str(arrays['method']),
+                           *(arrays[name] if name in arrays else None for name in ('x', 'y', 'coef')),
+                           threshold=float(arrays['threshold']))
+
+
+def fit_calibration(probabilities, labels, method='isotonic'):
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    labels = np.asarray(labels)
+    if method == 'isotonic':
+        from sklearn.isotonic import IsotonicRegression
+
+        isotonic = IsotonicRegression(y_min=0, y_max=1, out_of_bounds='clip').fit(probabilities, labels)
+        return Calibration('isotonic', isotonic.X_thresholds_.astype(np.float32),
+                           isotonic.y_thresholds_.astype(np.float32))
+    if method == 'platt':
+        from sklearn.linear_model import LogisticRegression
+
+        platt = LogisticRegression(C=1e6).fit(_logit(probabilities)[:, None], labels)
+        return Calibration('platt', coef=np.array([platt.coef_[0, 0], platt.intercept_[0]]))
+    if method == 'none':
+        return Calibration('none')
+    raise ValueError(f"Unknown calibration method {method}")
+
+
+def tune_threshold(calibrated, labels, objective='accuracy'):
+    # Scores every distinct cut at once from cumulative counts over the
+    # probabilities sorted in descending order
+    order = np.argsort(-calibrated, kind='stable')
+    scores, labels = calibrated[order], np.asarray(labels)[order]
+    true_positives = np.cumsum(labels)
+    false_positives = np.cumsum(1 - labels)
+    positives, total = true_positives[-1], len(labels)
+    negatives = total - positives
+    # Predicting positive for the first i + 1 rows means a cut at scores[i];
+    # only the last row of each run of equal scores is a valid cut
+    last = np.r_[scores[1:] != scores[:-1], True]
+    tp, fp = true_positives[last], false_positives[last]
+    if objective == 'accuracy':
+        score = (tp + (negatives - fp)) / total
+    elif objective == 'f1':
+        score = 2 * tp / np.maximum(tp + fp + positives, 1)
+    elif objective == 'youden':
+        score = tp / max(positives, 1) - fp / max(negatives, 1)
+    else:
+        raise ValueError(f"Unknown threshold objective {objective}")
+    return float(scores[last][np.argmax(score)])
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from batch_predict import score_frame
+from calibration import IDENTITY
+
+# Columns shown next to the scores in the cohort table
+SUMMARY_COLUMNS = ['age', 'gender', 'cancer_stage', 'smoking_status', 'treatment_type']
+LABELS = {1: 'SURVIVED', 0: 'DID NOT SURVIVE'}
+
+
+def score_cohort(model, raw, imputation=None, calibration=IDENTITY, cache=None, audit=None):
+    # Valid rows are scored with one batched model call; invalid ones are
+    # kept with their error and no score (see score_frame)
+    scored = score_frame(model, raw, imputation, cache=cache, calibration=calibration, audit=audit)
+
+    result = pd.DataFrame({'id': raw['id'] if 'id' in raw.columns else np.arange(1, len(raw) + 1)},
+                          index=raw.index)
+    for name in SUMMARY_COLUMNS:
+        result[name] = raw[name]
+    result['probability'] = scored['probability']
+    result['prediction'] = scored['prediction'].map(LABELS).fillna('')
+    result['error'] = scored['error']
+    return result.reset_index(drop=True)
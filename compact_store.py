@@ -0,0 +1,186 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from feature_schema import SCHEMA
+from preprocessing import check_columns, row_errors, unfilled
+
+DEFAULT_CHUNK_SIZE = 50_000
+# Shares of the rows kept out of fitting. Each holdout has one job so the
+# reported test metrics are never tuned on: eval picks the best iteration,
+# calibration fits the calibration map and the threshold.
+HOLDOUT_SIZES = {'test': 0.2, 'eval': 0.1, 'calibration': 0.1}
+
+
+def peak_memory_mb():
+    # Peak resident set size of this process, where the platform reports it
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 2 ** 20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+class CompactStore:
+    # Encoded features held column by column in the schema's compact dtypes
+    # (int8 codes and flags with -1 = missing, float32 with NaN = missing)
+    def __init__(self, columns, labels, ids=None, schema=SCHEMA, unknown=None, errors=None):
+        self.columns = columns
+        self.labels = labels
+        self.ids = ids
+        self.schema = schema
+        # Raw values the schema couldn't encode, per column (see unknown_counts)
+        self.unknown = unknown or {}
+        # Validation message by row position, for invalid rows only (see row_errors)
+        self.errors = errors if errors is not None else pd.Series(dtype=object)
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.columns.values()) + self.labels.nbytes
+
+    def row_errors(self, rows):
+        # One message per row of a slice, '' when valid, indexed like frame(rows)
+        start, stop, _ = rows.indices(len(self))
+        errors = np.full(max(stop - start, 0), '', dtype=object)
+        inside = self.errors[(self.errors.index >= start) & (self.errors.index < stop)]
+        errors[inside.index - start] = inside.to_numpy()
+        return pd.Series(errors)
+
+    def impute(self, stats):
+        # Same imputation preprocess() applies when serving; rows left with a
+        # missing category get the same error as in preprocess_checked()
+        self.columns = self.schema.impute(self.columns, stats)
+        for name, bad in unfilled(self.columns, self.schema):
+            rows, message = np.flatnonzero(bad), f"no value for {name}"
+            errors = [f"{error}; {message}" if error else message
+                      for error in self.errors.reindex(rows, fill_value='')]
+            self.errors = pd.concat([self.errors.drop(rows, errors='ignore'),
+                                     pd.Series(errors, index=rows, dtype=object)]).sort_index()
+
+    def frame(self, index=None):
+        # Only the selected rows are materialized; categories keep their
+        # string labels so the model sees the same values as at serving time
+        return self.schema.frame(self.columns, index)
+
+    def frames(self, index, chunk_size=DEFAULT_CHUNK_SIZE):
+        # frame() a chunk of the selected rows at a time
+        for start in range(0, len(index), chunk_size):
+            yield self.frame(index[start:start + chunk_size])
+
+    def pool(self, index=None, quantize=False):
+        from catboost import Pool
+
+        labels = self.labels if index is None else self.labels[index]
+        pool = Pool(self.frame(index), labels, cat_features=self.schema.categorical)
+        if quantize:
+            pool.quantize()
+        return pool
+
+    def file_pool(self, index, directory, chunk_size=DEFAULT_CHUNK_SIZE):
+        # Same pool as pool(index), written to a TSV in directory a chunk at
+        # a time and read back by CatBoost. CatBoost keeps the categories as
+        # hashes, so no DataFrame or string copy of all the rows is built.
+        # Left unquantized: fit() then picks the same borders as for a
+        # DataFrame (Pool.quantize samples large pools with its own seed).
+        from catboost import Pool
+
+        names = self.schema.names
+        data_path, cd_path = os.path.join(directory, 'pool.tsv'), os.path.join(directory, 'pool.cd')
+        with open(cd_path, 'w') as f:
+            f.write('0\tLabel\n')
+            for i, name in enumerate(names, 1):
+                f.write(f"{i}\t{'Categ' if name in self.schema.categorical else 'Num'}\t{name}\n")
+        with open(data_path, 'w', newline='') as f:
+            for start, chunk in zip(range(0, len(index), chunk_size), self.frames(index, chunk_size)):
+                chunk.insert(0, 'label', self.labels[index[start:start + chunk_size]])
+                chunk.to_csv(f, sep='\t', header=False, index=False, na_rep='nan')
+        pool = Pool(data_path, column_description=cd_path)
+        os.remove(data_path)
+        return pool
+
+
+def stratified_split(labels, test_size=0.2, seed=42):
+    # Row indices only; the data itself is never copied by the split
+    from sklearn.model_selection import train_test_split
+
+    return train_test_split(np.arange(len(labels)), test_size=test_size,
+                            random_state=seed, stratify=labels)
+
+
+def holdout_split(labels, seed=42):
+    # Disjoint stratified row indices for train and each holdout; training,
+    # the hyperparameter search and feature selection all use these
+    labels = np.asarray(labels)
+    rows, rest, remaining = {}, np.arange(len(labels)), 1.0
+    for name, size in HOLDOUT_SIZES.items():
+        keep, held = stratified_split(labels[rest], size / remaining, seed)
+        rows[name], rest = rest[held], rest[keep]
+        remaining -= size
+    rows['train'] = rest
+    return rows
+
+
+def build_compact_store(csv_path, chunk_size=DEFAULT_CHUNK_SIZE, today=None, schema=SCHEMA):
+    # Stream the CSV once. Non-numeric raw columns keep running value counts so
+    # the imputation modes are exact; numeric medians come from the stored
+    # columns afterwards.
+    parts = {name: [] for name in schema.names}
+    labels, ids = [], []
+    counts, unknown = {}, {}
+    numeric = set()
+    errors, offset = [], 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+        if 'survived' in chunk.columns:
+            chunk = chunk.dropna(subset=['survived'])
+            labels.append(chunk['survived'].to_numpy(dtype=np.int8))
+        else:
+            # Unlabelled extracts (for scoring) mark every label as unknown
+            labels.append(np.full(len(chunk), -1, dtype=np.int8))
+        for name in chunk.columns.drop(['id', 'survived'], errors='ignore'):
+            if is_numeric_dtype(chunk[name]):
+                numeric.add(name)
+            else:
+                chunk_counts = chunk[name].value_counts()
+                counts[name] = chunk_counts if name not in counts else \
+                    counts[name].add(chunk_counts, fill_value=0)
+
+        check_columns(chunk, schema)
+        arrays = schema.encode_frame(chunk, today)
+        for name, count in schema.unknown_counts(chunk, arrays).items():
+            unknown[name] = unknown.get(name, 0) + count
+        chunk_errors = row_errors(chunk, arrays, schema).to_numpy()
+        invalid = np.flatnonzero(chunk_errors != '')
+        errors.append(pd.Series(chunk_errors[invalid], index=offset + invalid, dtype=object))
+        offset += len(chunk)
+        for name in schema.names:
+            parts[name].append(arrays[name])
+        if 'id' in chunk.columns:
+            ids.append(chunk['id'].to_numpy())
+
+    # One column at a time, so the chunks and the joined store are never
+    # held in full together
+    columns = {name: np.concatenate(parts.pop(name)) for name in schema.names}
+    store = CompactStore(columns, np.concatenate(labels), np.concatenate(ids) if ids else None, schema,
+                         unknown, pd.concat(errors) if errors else None)
+
+    # Ties go to the smallest value, as with DataFrame.mode() in fit_imputation
+    stats = {name: value_counts[value_counts == value_counts.max()].index.min()
+             for name, value_counts in counts.items()}
+    for column in schema.columns:
+        name = column['name']
+        if name in numeric - set(counts):
+            values = columns[name]
+            stats[name] = float(np.median(values[~schema.missing(column, values)]))
+    return store, stats
@@ -0,0 +1,318 @@
+import argparse
+import io
+import json
+import os
+import tempfile
+import time
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import model_schema
+
+BLOCK_ROWS = 2048
+
+
+def compiled_path(model_path):
+    # Same stem as the .cbm so the saved preprocessing statistics are shared
+    return os.path.splitext(model_path)[0] + '.npz'
+
+
+def _binary_features(features_info):
+    # CatBoost numbers every binary split globally: float borders first, then
+    # one-hot values, then CTR borders, each in declaration order
+    binary = []
+    for feature in features_info.get('float_features', []):
+        for border in feature['borders']:
+            binary.append(('float', feature['feature_index'], border))
+    for feature in features_info.get('categorical_features', []):
+        for value in feature.get('values', []):
+            binary.append(('one_hot', feature['feature_index'], value))
+    for ctr_index, ctr in enumerate(features_info.get('ctrs', [])):
+        for border in ctr['borders']:
+            binary.append(('ctr', ctr_index, border))
+    return binary
+
+
+def _split_inputs(split, binary, features_info, float_flat, cat_flat):
+    # Which categorical columns and float conditions decide a non-float split
+    kind, index, value = binary[split['split_index']]
+    if split['split_type'] == 'OneHotFeature':
+        if kind != 'one_hot' or value != split['value']:
+            raise ValueError(f"Unexpected one-hot split {split}")
+        return (cat_flat[index],), ()
+    if kind != 'ctr' or not np.isclose(value, split['border']):
+        raise ValueError(f"Unexpected CTR split {split}")
+
+    cats, floats = set(), {}
+    for element in features_info['ctrs'][index]['elements']:
+        element_type = element['combination_element']
+        if element_type in ('cat_feature_value', 'cat_feature_exact_value'):
+            cats.add(cat_flat[element['cat_feature_index']])
+        elif element_type == 'float_feature':
+            column = float_flat[element['float_feature_index']]
+            floats.setdefault(column, set()).add(np.float32(element['border']))
+        else:
+            raise ValueError(f"Unsupported CTR element {element_type}")
+    return (tuple(sorted(cats)),
+            tuple((column, tuple(sorted(borders))) for column, borders in sorted(floats.items())))
+
+
+def _probe_values(borders):
+    # One representative value for every interval the borders cut the line into
+    borders = np.asarray(borders, dtype=np.float32)
+    inner = (borders[:-1] + borders[1:]) / 2
+    return np.concatenate([[borders[0] - 1], inner, [borders[-1] + 1]]).astype(np.float32)
+
+
+def export_model(model, category_values=None):
+    # Flatten a trained CatBoostClassifier into plain arrays. Float splits are
+    # stored as (column, border) per tree level. Categorical splits (one-hot
+    # and CTRs) depend only on a few categorical columns and float conditions,
+    # so their outcome for every combination of inputs is read back from the
+    # native model once and stored as a lookup table of leaf-index bits.
+    # The vocabulary comes from the model's feature schema unless given.
+    from catboost import Pool
+
+    if category_values is None:
+        category_values = {column['name']: column['values'] for column in model_schema(model).columns
+                           if column['kind'] == 'category'}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'model.json')
+        model.save_model(json_path, format='json')
+        with open(json_path) as f:
+            dump = json.load(f)
+
+    features_info = dump['features_info']
+    feature_names = list(model.feature_names_)
+    float_flat = {f['feature_index']: f['flat_feature_index']
+                  for f in features_info.get('float_features', [])}
+    cat_flat = {f['feature_index']: f['flat_feature_index']
+                for f in features_info.get('categorical_features', [])}
+    vocab = {column: list(category_values[feature_names[column]]) for column in cat_flat.values()}
+    binary = _binary_features(features_info)
+
+    trees = dump['oblivious_trees']
+    depth = max(len(tree['splits'] or []) for tree in trees)
+    split_column = np.full((len(trees), depth), -1, dtype=np.int32)
+    leaf_values = np.zeros((len(trees), 2 ** depth), dtype=np.float64)
+    float_binaries = {}
+    groups = {}
+
+    for t, tree in enumerate(trees):
+        values = tree['leaf_values']
+        leaf_values[t, :len(values)] = values
+        for position, split in enumerate(tree['splits'] or []):
+            if split['split_type'] == 'FloatFeature':
+                key = (float_flat[split['float_feature_index']], np.float32(split['border']))
+                split_column[t, position] = float_binaries.setdefault(key, len(float_binaries))
+            else:
+                inputs = _split_inputs(split, binary, features_info, float_flat, cat_flat)
+                groups.setdefault(inputs, {}).setdefault(split['split_index'], []).append((t, position))
+
+    # Lookup splits get the binary columns after the float ones, group by
+    # group; levels a shallow tree doesn't have read an always-zero column
+    column = len(float_binaries)
+    for splits in groups.values():
+        for uses in splits.values():
+            for t, position in uses:
+                split_column[t, position] = column
+            column += 1
+    split_column[split_column < 0] = column
+
+    # Probe every input combination of every group in one native call
+    base = {name: 0.0 for name in feature_names}
+    for column, values in vocab.items():
+        base[feature_names[column]] = values[0]
+    probes, spans = [], []
+    for cats, floats in groups:
+        axes = [vocab[column] for column in cats] + [_probe_values(b) for _, b in floats]
+        columns = [feature_names[c] for c in cats] + [feature_names[c] for c, _ in floats]
+        start = len(probes)
+        for combination in product(*axes):
+            row = dict(base)
+            row.update(zip(columns, combination))
+            probes.append(row)
+        spans.append((start, len(probes)))
+
+    arrays = {
+        'feature_names': np.array(json.dumps(feature_names)),
+        'vocab': np.array(json.dumps({str(c): v for c, v in vocab.items()})),
+        'binary_feature': np.array([c for c, _ in float_binaries], dtype=np.int32),
+        'binary_border': np.array([b for _, b in float_binaries], dtype=np.float32),
+        'split_column': split_column,
+        'leaf_values': leaf_values,
+        'scale': np.float64(dump['scale_and_bias'][0]),
+        'bias': np.float64(dump['scale_and_bias'][1][0]),
+    }
+    if not groups:
+        arrays['groups'] = np.array('[]')
+        return arrays
+
+    probe_frame = pd.DataFrame(probes, columns=feature_names)
+    leaf_indexes = model.calc_leaf_indexes(
+        Pool(probe_frame, cat_features=sorted(cat_flat.values())))
+
+    group_specs = []
+    for g, ((cats, floats), splits) in enumerate(groups.items()):
+        start, end = spans[g]
+        table = np.empty((end - start, len(splits)), dtype=np.uint8)
+        for j, uses in enumerate(splits.values()):
+            t, position = uses[0]
+            table[:, j] = (leaf_indexes[start:end, t] >> position) & 1
+        arrays[f'group_table_{g}'] = table
+        group_specs.append({'cats': list(cats),
+                            'floats': [[column, list(map(float, b))] for column, b in floats]})
+    arrays['groups'] = np.array(json.dumps(group_specs))
+    return arrays
+
+
+class CompiledModel:
+    # Evaluates the exported trees with NumPy only; exposes predict_proba like
+    # CatBoostClassifier so it can be passed anywhere a model is expected
+    def __init__(self, arrays):
+        self.feature_names_ = json.loads(str(arrays['feature_names']))
+        self.vocab = {int(c): v for c, v in json.loads(str(arrays['vocab'])).items()}
+        self.binary_feature = arrays['binary_feature']
+        self.binary_border = arrays['binary_border'][:, None]
+        self.split_column = arrays['split_column']
+        self.leaf_values = arrays['leaf_values']
+        self.scale = float(arrays['scale'])
+        self.bias = float(arrays['bias'])
+        self.tree_count_ = len(self.leaf_values)
+        self.groups = []
+        for g, spec in enumerate(json.loads(str(arrays['groups']))):
+            floats = [(column, np.asarray(borders, dtype=np.float32))
+                      for column, borders in spec['floats']]
+            self.groups.append((spec['cats'], floats, arrays[f'group_table_{g}'].T.copy()))
+        # Content hash of the .cbm this was exported from (None before it was recorded)
+        self.source_sha256 = str(arrays['source_sha256']) if 'source_sha256' in arrays else None
+        self.n_columns = int(self.split_column.max()) + 1
+        self._leaf_dtype = np.uint8 if self.split_column.shape[1] <= 8 else np.uint16
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(dict(arrays))
+
+    @classmethod
+    def from_bytes(cls, blob):
+        with np.load(io.BytesIO(blob)) as arrays:
+            return cls(dict(arrays))
+
+    def _encode(self, features):
+        # Column-major float matrix for the float splits plus vocabulary codes
+        # for the categorical columns
+        values = np.zeros((len(self.feature_names_), len(features)), dtype=np.float32)
+        codes = {}
+        for column, name in enumerate(self.feature_names_):
+            if column in self.vocab:
+                codes[column] = pd.Categorical(features[name], categories=self.vocab[column]).codes
+                if (codes[column] < 0).any():
+                    unknown = set(features[name][codes[column] < 0])
+                    raise ValueError(f"Unknown {name} value(s): {sorted(map(str, unknown))}")
+            else:
+                values[column] = features[name].to_numpy(dtype=np.float32)
+        return values, codes
+
+    def _raw_block(self, values, codes):
+        # One uint8 row per binary split, then every tree's leaf index is
+        # assembled level by level from those rows
+        bits = np.zeros((self.n_columns, values.shape[1]), dtype=np.uint8)
+        column = len(self.binary_feature)
+        bits[:column] = values[self.binary_feature] > self.binary_border
+        for cats, floats, table in self.groups:
+            combination = np.zeros(values.shape[1], dtype=np.intp)
+            for cat in cats:
+                combination = combination * len(self.vocab[cat]) + codes[cat]
+            for feature, borders in floats:
+                interval = np.searchsorted(borders, values[feature], side='left')
+                combination = combination * (len(borders) + 1) + interval
+            bits[column:column + len(table)] = table[:, combination]
+            column += len(table)
+
+        bits = bits.astype(self._leaf_dtype, copy=False)
+        leaf = bits[self.split_column[:, 0]]
+        for level in range(1, self.split_column.shape[1]):
+            leaf |= bits[self.split_column[:, level]] << level
+        contributions = np.take_along_axis(self.leaf_values, leaf, axis=1)
+        return contributions.sum(axis=0) * self.scale + self.bias
+
+    def predict_raw(self, features):
+        values, codes = self._encode(features)
+        raw = np.empty(values.shape[1])
+        for start in range(0, len(raw), BLOCK_ROWS):
+            block = slice(start, start + BLOCK_ROWS)
+            raw[block] = self._raw_block(values[:, block], {c: v[block] for c, v in codes.items()})
+        return raw
+
+    def predict_proba(self, features, thread_count=-1):
+        probability = 1 / (1 + np.exp(-self.predict_raw(features)))
+        return np.column_stack([1 - probability, probability])
+
+    def predict(self, features, thread_count=-1):
+        return (self.predict_proba(features)[:, 1] >= 0.5).astype(np.int64)
+
+
+def save_compiled(arrays, path):
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def verify_parity(model, compiled, features, tolerance=1e-6):
+    native = model.predict_proba(features)[:, 1]
+    ours = compiled.predict_proba(features)[:, 1]
+    max_error = float(np.abs(native - ours).max())
+    if max_error > tolerance:
+        raise AssertionError(f"Compiled model differs from CatBoost by {max_error:.2e}")
+    return max_error
+
+
+def benchmark(model, compiled, features, repeats=3):
+    results = {}
+    for name, predictor in [('catboost', model), ('compiled', compiled)]:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predictor.predict_proba(features)
+            timings.append(time.perf_counter() - start)
+        results[name] = len(features) / min(timings)
+    return results
+
+
+def main():
+    from batch_predict import DEFAULT_MODEL_PATH, load_model
+    from preprocessing import load_preprocessing, preprocess
+    from synthetic_data import make_patients
+
+    parser = argparse.ArgumentParser(description="Export a CatBoost model to NumPy lookup tables")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="CatBoost model file")
+    parser.add_argument('--output', help="Compiled .npz file (default: next to the model)")
+    parser.add_argument('--rows', type=int, default=100_000,
+                        help="Synthetic rows for the parity check and benchmark")
+    args = parser.parse_args()
+
+    output = args.output or compiled_path(args.model)
+    start = time.perf_counter()
+    model = load_model(args.model)
+    save_compiled({**export_model(model), 'source_sha256': np.array(model.sha256)}, output)
+    print(f"💾 Compiled {model.tree_count_} trees to {output} in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    compiled = CompiledModel.load(output)
+    print(f"📂 Compiled model loads in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    features = preprocess(make_patients(args.rows), load_preprocessing(args.model),
+                          schema=model.feature_schema)
+    max_error = verify_parity(model, compiled, features)
+    print(f"✅ Parity with CatBoost on {args.rows} rows (max error {max_error:.2e})")
+
+    rates = benchmark(model, compiled, features)
+    for name, rate in rates.items():
+        print(f"⏱️ {name:>9}: {rate:>12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
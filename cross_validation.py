@@ -0,0 +1,119 @@
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from compact_store import DEFAULT_CHUNK_SIZE
+from dataset_cache import DEFAULT_CACHE_DIR, ensure_cached, load_store
+
+DEFAULT_FOLDS = 5
+
+# Per-process store, fold indices and CatBoost settings, set by _init_worker
+_worker = {}
+
+
+def stratified_folds(labels, n_folds=DEFAULT_FOLDS, seed=42):
+    # (train, test) row indices for every fold; the data itself is never copied
+    from sklearn.model_selection import StratifiedKFold
+
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    return list(splitter.split(np.zeros(len(labels)), labels))
+
+
+def _init_worker(cache_directory, n_folds, params, thread_count):
+    # Every fold worker memory-maps the same cached columns instead of holding
+    # its own DataFrame copy of the whole dataset
+    store, imputation = load_store(cache_directory)
+    store.impute(imputation)
+    _worker['store'] = store
+    _worker['folds'] = stratified_folds(store.labels, n_folds)
+    _worker['params'] = params
+    _worker['thread_count'] = thread_count
+
+
+def _run_fold(fold):
+    from catboost import CatBoostClassifier
+    from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+
+    store = _worker['store']
+    train_index, test_index = _worker['folds'][fold]
+    model = CatBoostClassifier(**_worker['params'], thread_count=_worker['thread_count'], verbose=0)
+    start = time.perf_counter()
+    model.fit(store.pool(train_index, quantize=True))
+    seconds = time.perf_counter() - start
+
+    labels = store.labels[test_index]
+    probabilities = model.predict_proba(store.frame(test_index))[:, 1]
+    return {
+        'fold': fold,
+        'rows': len(test_index),
+        'accuracy': accuracy_score(labels, probabilities >= 0.5),
+        'auc': roc_auc_score(labels, probabilities),
+        'logloss': log_loss(labels, probabilities),
+        'seconds': round(seconds, 3),
+        # Out-of-fold probabilities, used to fit the calibration
+        'probabilities': probabilities.astype(np.float32),
+    }
+
+
+def cross_validate(csv_path, params, n_folds=DEFAULT_FOLDS, workers=None, thread_count=None,
+                   cache_dir=DEFAULT_CACHE_DIR, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Folds train at the same time, each with an equal share of the cores
+    cpus = os.cpu_count() or 1
+    workers = workers or min(n_folds, cpus)
+    thread_count = thread_count or max(1, cpus // workers)
+    directory, hit = ensure_cached(csv_path, cache_dir, chunk_size)
+    print(f"🗃️ Dataset cache {'hit' if hit else 'miss'} ({os.path.basename(directory)})")
+
+    results = []
+    with Pool(workers, initializer=_init_worker,
+              initargs=(directory, n_folds, params, thread_count)) as pool:
+        for result in pool.imap_unordered(_run_fold, range(n_folds)):
+            results.append(result)
+            print(f"✅ Fold {result['fold'] + 1}/{n_folds}: acc={result['accuracy']:.4f} "
+                  f"auc={result['auc']:.4f} logloss={result['logloss']:.4f} {result['seconds']:.1f}s")
+    return sorted(results, key=lambda result: result['fold'])
+
+
+def summarize(results):
+    # Mean and standard deviation of every metric across folds
+    summary = {}
+    for metric in ('accuracy', 'auc', 'logloss', 'seconds'):
+        values = np.array([result[metric] for result in results])
+        summary[metric] = (float(values.mean()), float(values.std()))
+    return summary
+
+
+def report(results, wall_seconds):
+    summary = summarize(results)
+    for metric in ('accuracy', 'auc', 'logloss'):
+        mean, std = summary[metric]
+        print(f"📊 {metric}: {mean:.4f} ± {std:.4f}")
+    fit_seconds = sum(result['seconds'] for result in results)
+    print(f"⏱️ {len(results)} folds in {wall_seconds:.1f}s wall "
+          f"({fit_seconds:.1f}s of fitting, {summary['seconds'][0]:.1f}s per fold)")
+
+
+def main():
+    from train_model import MODEL_PARAMS
+
+    parser = argparse.ArgumentParser(description="Parallel stratified k-fold cross-validation")
+    parser.add_argument('--data', default='your_dataset.csv', help="Training CSV")
+    parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    parser.add_argument('--workers', type=int, help="Folds trained at the same time (default: one per fold)")
+    parser.add_argument('--threads-per-worker', type=int,
+                        help="CatBoost threads per fold (default: cores / workers)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--dataset-cache', default=DEFAULT_CACHE_DIR, metavar='DIR')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = cross_validate(args.data, MODEL_PARAMS, args.folds, args.workers,
+                             args.threads_per_worker, args.dataset_cache, args.chunk_size)
+    report(results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
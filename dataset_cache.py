@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from compact_store import DEFAULT_CHUNK_SIZE, CompactStore, build_compact_store
+from feature_schema import SCHEMA, FeatureSchema
+from prediction_cache import file_hash
+
+# Bump whenever FeatureSchema's encoding or the compact column layout changes
+# so old caches are rebuilt instead of silently reused
+PREPROCESSING_VERSION = 4
+DEFAULT_CACHE_DIR = '.dataset_cache'
+
+
+def cache_key(csv_path, schema=SCHEMA):
+    # The same CSV encoded for a model with another schema is another cache
+    return f"{file_hash(csv_path)[:16]}-{schema.fingerprint}-v{PREPROCESSING_VERSION}"
+
+
+def save_store(store, stats, directory, as_of):
+    # Write to a temporary directory first so readers never see half a cache
+    tmp = directory + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, values in store.columns.items():
+        np.save(os.path.join(tmp, f'{name}.npy'), values)
+    np.save(os.path.join(tmp, 'labels.npy'), store.labels)
+    if store.ids is not None:
+        np.save(os.path.join(tmp, 'ids.npy'), store.ids)
+    with open(os.path.join(tmp, 'errors.json'), 'w') as f:
+        json.dump({'rows': store.errors.index.tolist(), 'messages': store.errors.tolist()}, f)
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump({'columns': list(store.columns), 'imputation': stats, 'rows': len(store),
+                   'as_of': as_of.isoformat(), 'version': PREPROCESSING_VERSION,
+                   'schema': store.schema.to_dict(), 'unknown': store.unknown}, f, indent=2)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+
+def load_store(directory, today=None):
+    # Columns are memory-mapped; only the day counts are shifted to today
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+    columns = {name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+               for name in meta['columns']}
+    schema = FeatureSchema(meta['schema']['columns'])
+    shift = ((today or date.today()) - date.fromisoformat(meta['as_of'])).days
+    if shift:
+        for column in schema.columns:
+            if column['kind'] == 'days_since':
+                columns[column['name']] = columns[column['name']] + np.float32(shift)
+    ids_path = os.path.join(directory, 'ids.npy')
+    ids = np.load(ids_path, mmap_mode='r') if os.path.exists(ids_path) else None
+    labels = np.load(os.path.join(directory, 'labels.npy'), mmap_mode='r')
+    with open(os.path.join(directory, 'errors.json')) as f:
+        errors = json.load(f)
+    errors = pd.Series(errors['messages'], index=errors['rows'], dtype=object)
+    return CompactStore(columns, labels, ids, schema, meta['unknown'], errors), meta['imputation']
+
+
+def ensure_cached(csv_path, cache_dir=DEFAULT_CACHE_DIR, chunk_size=DEFAULT_CHUNK_SIZE, schema=SCHEMA):
+    # Returns the cache directory for csv_path and whether it already existed
+    directory = os.path.join(cache_dir, cache_key(csv_path, schema))
+    if os.path.exists(os.path.join(directory, 'meta.json')):
+        return directory, True
+
+    today = date.today()
+    store, stats = build_compact_store(csv_path, chunk_size, today, schema)
+    os.makedirs(cache_dir, exist_ok=True)
+    save_store(store, stats, directory, today)
+    return directory, False
+
+
+def load_or_build(csv_path, cache_dir=DEFAULT_CACHE_DIR, chunk_size=DEFAULT_CHUNK_SIZE, schema=SCHEMA):
+    # Returns the un-imputed store, its own imputation statistics and whether
+    # the cache was hit
+    directory, hit = ensure_cached(csv_path, cache_dir, chunk_size, schema)
+    store, stats = load_store(directory)
+    return store, stats, hit
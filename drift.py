@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import SCHEMA
+from metrics import timer
+
+PROFILE_BINS = 20
+# Rows of the training split the reference profile is built from
+PROFILE_ROWS = 200_000
+# Population stability index above which a feature is reported as drifted
+PSI_ALERT = 0.2
+# Smaller batches are buffered and binned together once this many rows
+# arrived; per-column pandas calls cost more than the binning itself
+BUFFER_ROWS = 1024
+
+
+def profile_path(model_path):
+    return os.path.splitext(model_path)[0] + '_profile.json'
+
+
+def _binner(spec):
+    # Bin index per value; the last bin collects missing and unknown values.
+    # The lookup index and edges are built once per feature, not per batch.
+    if spec['kind'] == 'frequency':
+        levels = pd.Index(spec['levels'])
+
+        def bin_values(values):
+            codes = levels.get_indexer(np.asarray(values))
+            return np.where(codes < 0, len(levels), codes)
+    else:
+        edges = np.asarray(spec['edges'], dtype=np.float64)
+
+        def bin_values(values):
+            values = np.asarray(values, dtype=np.float64)
+            return np.where(np.isnan(values), len(edges) + 1, np.searchsorted(edges, values, side='right'))
+    return bin_values
+
+
+def build_profile(features, schema=SCHEMA, bins=PROFILE_BINS):
+    # Category and level frequencies, and counts between the training
+    # quantiles for numeric columns; serving traffic is binned the same way
+    profile = {}
+    for column in schema.columns:
+        name, values = column['name'], features[column['name']]
+        if column['kind'] == 'category':
+            spec = {'kind': 'frequency', 'levels': list(column['values'])}
+        elif column['kind'] == 'mapped':
+            spec = {'kind': 'frequency', 'levels': sorted(set(column['mapping'].values()))}
+        else:
+            quantiles = np.nanquantile(np.asarray(values, dtype=np.float64), np.linspace(0, 1, bins + 1)[1:-1])
+            spec = {'kind': 'quantile', 'edges': np.unique(quantiles).tolist()}
+        size = len(spec['levels']) + 1 if spec['kind'] == 'frequency' else len(spec['edges']) + 2
+        spec['counts'] = np.bincount(_binner(spec)(values), minlength=size).tolist()
+        profile[name] = spec
+    return {'rows': len(features), 'features': profile}
+
+
+def save_profile(profile, model_path):
+    with open(profile_path(model_path), 'w') as f:
+        json.dump(profile, f)
+
+
+def load_profile(model_path):
+    # None for models trained before profiles were saved
+    path = profile_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def psi(expected, actual, floor=1e-4):
+    expected = np.maximum(expected / max(expected.sum(), 1), floor)
+    actual = np.maximum(actual / max(actual.sum(), 1), floor)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks(expected, actual):
+    # Largest gap between the binned cumulative distributions
+    expected = np.cumsum(expected) / max(expected.sum(), 1)
+    actual = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.abs(expected - actual).max())
+
+
+class DriftMonitor:
+    # Running bin counts of every scored feature. Memory is fixed by the
+    # profile (plus at most BUFFER_ROWS buffered rows), an update is one
+    # bincount per column, and scores are worked out from the counts
+    # whenever they are asked for.
+    def __init__(self, profile):
+        self.profile = profile['features']
+        self.names = list(self.profile)
+        self.binners = {name: _binner(spec) for name, spec in self.profile.items()}
+        self.reference = {name: np.asarray(spec['counts'], dtype=np.float64)
+                          for name, spec in self.profile.items()}
+        self.counts = {name: np.zeros(len(counts), dtype=np.int64) for name, counts in self.reference.items()}
+        self.rows = 0
+        self._pending = []
+        self._pending_rows = 0
+        self._lock = threading.Lock()
+
+    def update(self, features):
+        # Small frames are kept as they are and joined when the buffer is
+        # full; columns are then read one by one in their own dtypes. (A
+        # mixed frame's to_numpy() builds an object array, and per-column
+        # access costs more than that on a single row.)
+        with timer('drift_update'):
+            if len(features) >= BUFFER_ROWS:
+                self._add_frame(features)
+                return
+            with self._lock:
+                self._pending.append(features)
+                self._pending_rows += len(features)
+                if self._pending_rows < BUFFER_ROWS:
+                    return
+                pending = self._take_pending()
+            self._add_frame(pending)
+
+    def _take_pending(self):
+        # Called with the lock held
+        pending = pd.concat(self._pending, ignore_index=True) if self._pending else None
+        self._pending, self._pending_rows = [], 0
+        return pending
+
+    def _add_frame(self, features):
+        if features is not None:
+            self._add({name: features[name].to_numpy() for name in self.names}, len(features))
+
+    def _add(self, columns, n_rows):
+        binned = {name: np.bincount(self.binners[name](values), minlength=len(self.counts[name]))
+                  for name, values in columns.items()}
+        with self._lock:
+            for name, counts in binned.items():
+                self.counts[name] += counts
+            self.rows += n_rows
+
+    def scores(self):
+        with self._lock:
+            pending = self._take_pending()
+        self._add_frame(pending)
+        with self._lock:
+            counts = {name: values.copy() for name, values in self.counts.items()}
+            rows = self.rows
+        scores = {}
+        for name, spec in self.profile.items():
+            score = {'psi': round(psi(self.reference[name], counts[name]), 4)}
+            if spec['kind'] == 'quantile':
+                score['ks'] = round(ks(self.reference[name], counts[name]), 4)
+            scores[name] = score
+        return {'rows': rows, 'features': scores}
+
+    def drifted(self, threshold=PSI_ALERT):
+        return [name for name, score in self.scores()['features'].items() if score['psi'] > threshold]
+
+    def report(self, threshold=PSI_ALERT):
+        scores = self.scores()
+        print(f"📉 Drift over {scores['rows']} scored rows (PSI > {threshold} flagged):")
+        for name, score in scores['features'].items():
+            flag = '⚠️' if score['psi'] > threshold else '  '
+            ks_text = f", KS {score['ks']:.3f}" if 'ks' in score else ''
+            print(f"{flag} {name:>26}: PSI {score['psi']:.3f}{ks_text}")
+
+
+def main():
+    from batch_predict import DEFAULT_MODEL_PATH
+    from feature_schema import load_schema
+    from preprocessing import load_preprocessing, preprocess
+
+    parser = argparse.ArgumentParser(description="Compare a CSV of patients with a model's training profile")
+    parser.add_argument('input', help="CSV with the same fields the GUI form collects")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--threshold', type=float, default=PSI_ALERT)
+    args = parser.parse_args()
+
+    profile = load_profile(args.model)
+    if profile is None:
+        parser.error(f"No reference profile next to {args.model}; retrain to create one")
+    monitor = DriftMonitor(profile)
+    imputation, schema = load_preprocessing(args.model), load_schema(args.model)
+    for chunk in pd.read_csv(args.input, chunksize=args.chunk_size):
+        monitor.update(preprocess(chunk, imputation, schema=schema))
+    monitor.report(args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from batch_predict import DEFAULT_CHUNK_SIZE, DEFAULT_MODEL_PATH, load_model
+from feature_schema import model_schema
+from metrics import timer
+from prediction_cache import row_keys
+from preprocessing import load_preprocessing, preprocess
+
+DEFAULT_TOP = 3
+
+
+def shap_model(model, model_path):
+    # SHAP values need the CatBoost runtime; compiled .npz models fall back
+    # to the .cbm they were exported from
+    if hasattr(model, 'get_feature_importance'):
+        return model
+    return load_model(os.path.splitext(model_path)[0] + '.cbm')
+
+
+class ShapExplainer:
+    # Per-row SHAP contributions (one column per feature plus the expected
+    # value last), computed for a whole batch in one CatBoost call. Rows are
+    # deduplicated and kept in a bounded LRU keyed on row_keys(). Columns
+    # follow the model's feature schema.
+    def __init__(self, model, max_entries=10_000):
+        self.model = model
+        self.schema = model_schema(model)
+        self.names = self.schema.names
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def explain(self, features, thread_count=-1):
+        from catboost import Pool
+
+        keys = row_keys(features)
+        unique_keys, first_rows, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        values = np.empty((len(unique_keys), len(self.names) + 1), dtype=np.float32)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(unique_keys.tolist()):
+                cached = self._entries.get(key)
+                if cached is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    values[i] = cached
+
+        if missing:
+            with timer('shap_values'):
+                pool = Pool(features.iloc[first_rows[missing]], cat_features=self.schema.categorical)
+                values[missing] = self.model.get_feature_importance(
+                    pool, type='ShapValues', thread_count=thread_count)
+            with self._lock:
+                for i in missing:
+                    self._entries[int(unique_keys[i])] = values[i]
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return values[inverse]
+
+
+def top_contributors(shap_row, display_row, names, n=DEFAULT_TOP):
+    # (feature, shown value, contribution in log-odds of survival), largest
+    # effect first; names are the explainer's columns
+    order = np.argsort(-np.abs(shap_row[:len(names)]))[:n]
+    return [(names[i], display_row[names[i]], float(shap_row[i])) for i in order]
+
+
+def describe(contributors):
+    return ', '.join(f"{name}={value} ({'+' if contribution >= 0 else '−'}{abs(contribution):.2f})"
+                     for name, value, contribution in contributors)
+
+
+def explain_csv(explainer, input_path, output_path, imputation=None, top=DEFAULT_TOP,
+                chunk_size=DEFAULT_CHUNK_SIZE):
+    # One SHAP call per chunk; writes the full contribution matrix plus a
+    # readable summary of the top contributors
+    total_rows = 0
+    for chunk_number, chunk in enumerate(pd.read_csv(input_path, chunksize=chunk_size)):
+        features = preprocess(chunk, imputation, schema=explainer.schema)
+        values = explainer.explain(features)
+        result = pd.DataFrame(values[:, :-1], columns=[f'shap_{name}' for name in explainer.names],
+                              index=chunk.index)
+        result.insert(0, 'expected_value', values[:, -1])
+        if 'id' in chunk.columns:
+            result.insert(0, 'id', chunk['id'])
+        order = np.argsort(-np.abs(values[:, :-1]), axis=1)[:, :top]
+        shown = features.to_numpy(dtype=object)
+        result['top_contributors'] = [
+            describe([(explainer.names[j], shown[i, j], values[i, j]) for j in order[i]])
+            for i in range(len(values))]
+        result.to_csv(output_path, mode='w' if chunk_number == 0 else 'a',
+                      header=chunk_number == 0, index=False)
+        total_rows += len(chunk)
+    return total_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explain survival predictions with SHAP values")
+    parser.add_argument('input', help="CSV with the same fields the GUI form collects")
+    parser.add_argument('output', help="CSV to write per-feature contributions to")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="CatBoost model file")
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help="Contributors listed per patient")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    explainer = ShapExplainer(shap_model(load_model(args.model), args.model))
+    total_rows = explain_csv(explainer, args.input, args.output, load_preprocessing(args.model),
+                             args.top, args.chunk_size)
+    print(f"✅ Explained {total_rows} rows in {time.perf_counter() - start:.2f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
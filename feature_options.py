@@ -0,0 +1,11 @@
+# Mappings and options shared by the GUI form and preprocessing. Kept free of
+# heavy imports so the GUI can draw its form before pandas/catboost load.
+bmi_mapping = {'Low': 0, 'Normal': 1, 'High': 2}
+cholesterol_mapping = {'Normal': 0, 'High': 1}
+treatment_mapping = {'Surgery': 0, 'Chemotherapy': 1, 'Radiation': 2, 'Combined': 3}
+gender_options = ['Male', 'Female']
+country_options = ['USA', 'UK', 'India', 'Other']
+cancer_stage_options = ['Stage I', 'Stage II', 'Stage III', 'Stage IV']
+yes_no_options = ['Yes', 'No']
+smoking_status_options = ['Never', 'Current', 'Former']
+treatment_type_options = ['Surgery', 'Chemotherapy', 'Radiation', 'Combined']
@@ -0,0 +1,249 @@
+import copy
+import hashlib
+import json
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from preprocessing import (
+    BINARY_COLUMNS, CATEGORY_VALUES, DATE_COLUMNS, FEATURE_COLUMNS, MAPPED_COLUMNS
+)
+
+FLAG_MAPPING = {'Yes': 1, 'No': 0}
+# Code of a blank or unknown value in int8 columns, until it is imputed
+MISSING_CODE = -1
+
+
+def schema_path(model_path):
+    return os.path.splitext(model_path)[0] + '_schema.json'
+
+
+class FeatureSchema:
+    # Column order, dtypes and category dictionaries of the model's input.
+    # Raw records are encoded into typed arrays (int8 codes and flags,
+    # float32 numerics) and only turned into a DataFrame at the model
+    # boundary. Training, the compact store and every scorer encode through
+    # the schema saved with the model.
+    def __init__(self, columns):
+        self.columns = columns
+        self.names = [column['name'] for column in columns]
+        self.categorical = [column['name'] for column in columns if column['kind'] == 'category']
+        self._codes = {column['name']: {value: code for code, value in enumerate(column['values'])}
+                       for column in columns if column['kind'] == 'category'}
+        # Lookups for whole columns; get_indexer gives -1 for blank and
+        # unknown values
+        self._levels = {column['name']: pd.Index(column['values'] if column['kind'] == 'category'
+                                                 else list(column['mapping']))
+                        for column in columns if column['kind'] in ('category', 'mapped')}
+        self._fills = None
+
+    @classmethod
+    def default(cls):
+        # Built from the preprocessing constants the model is trained with
+        columns = []
+        days_sources = {days: raw for raw, days in DATE_COLUMNS.items()}
+        for name in FEATURE_COLUMNS:
+            if name in CATEGORY_VALUES:
+                column = {'kind': 'category', 'dtype': 'int8', 'values': list(CATEGORY_VALUES[name])}
+            elif name in BINARY_COLUMNS:
+                column = {'kind': 'mapped', 'dtype': 'int8', 'mapping': FLAG_MAPPING}
+            elif name in MAPPED_COLUMNS:
+                column = {'kind': 'mapped', 'dtype': 'int8', 'mapping': dict(MAPPED_COLUMNS[name])}
+            elif name in days_sources:
+                column = {'kind': 'days_since', 'dtype': 'float32', 'source': days_sources[name]}
+            else:
+                column = {'kind': 'numeric', 'dtype': 'float32'}
+            columns.append({'name': name, **column})
+        return cls(columns)
+
+    def to_dict(self):
+        return {'columns': copy.deepcopy(self.columns)}
+
+    def save(self, model_path):
+        with open(schema_path(model_path), 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def __eq__(self, other):
+        return isinstance(other, FeatureSchema) and self.columns == other.columns
+
+    @property
+    def fingerprint(self):
+        return hashlib.sha1(json.dumps(self.columns, sort_keys=True).encode()).hexdigest()[:12]
+
+    def source(self, column):
+        # Raw column a feature is read from
+        return column.get('source', column['name'])
+
+    def validate(self, model):
+        # Fail at load time, not on the first prediction, when the model was
+        # trained on different columns or categories
+        names = list(model.feature_names_)
+        if names != self.names:
+            raise ValueError(f"Model features {names} don't match the feature schema {self.names}")
+        categories = [i for i, column in enumerate(self.columns) if column['kind'] == 'category']
+        if hasattr(model, 'get_cat_feature_indices'):
+            model_categories = sorted(model.get_cat_feature_indices())
+        else:
+            model_categories = sorted(model.vocab)
+        if not set(model_categories) <= set(categories):
+            raise ValueError(f"Model treats columns {[names[i] for i in model_categories]} as categorical, "
+                             f"the feature schema {[names[i] for i in categories]}")
+        for i, vocab in getattr(model, 'vocab', {}).items():
+            unknown = set(vocab) - set(self.columns[i]['values'])
+            if unknown:
+                raise ValueError(f"Model knows {names[i]} values {sorted(unknown)} missing from the schema")
+
+    def allocate(self, n_rows=1):
+        return {column['name']: np.zeros(n_rows, dtype=column['dtype']) for column in self.columns}
+
+    def encode_records(self, records, out, today=None):
+        # Plain dict lookups per field, written into out (see allocate)
+        today = today or date.today()
+        for row, record in enumerate(records):
+            for column in self.columns:
+                name, kind = column['name'], column['kind']
+                try:
+                    if kind == 'category':
+                        value = self._codes[name][record[name]]
+                    elif kind == 'mapped':
+                        value = column['mapping'][record[name]]
+                    elif kind == 'days_since':
+                        value = (today - _as_date(record[column['source']])).days
+                    else:
+                        value = float(record[name])
+                except KeyError:
+                    raise ValueError(f"Unknown {name} value {record.get(name)!r}") from None
+                out[name][row] = value
+        return out
+
+    def encode_frame(self, raw, today=None):
+        # Whole columns at a time. Blank and unknown values become
+        # MISSING_CODE (int8 columns) or NaN (float32 columns) so that
+        # imputation treats them the same in every path.
+        today = pd.Timestamp(today or date.today())
+        arrays = {}
+        for column in self.columns:
+            name, kind = column['name'], column['kind']
+            if kind == 'category':
+                values = self._levels[name].get_indexer(raw[name]).astype(np.int8)
+            elif kind == 'mapped':
+                values = raw[name]
+                levels = np.array(list(column['mapping'].values()), dtype=np.int8)
+                if is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+                    # Already encoded, e.g. 0/1 flags
+                    numbers = values.to_numpy(dtype=np.float64)
+                    values = np.where(np.isin(numbers, levels), numbers, MISSING_CODE).astype(np.int8)
+                else:
+                    codes = self._levels[name].get_indexer(values)
+                    values = np.where(codes < 0, MISSING_CODE, levels[codes]).astype(np.int8)
+            elif kind == 'days_since':
+                # Rows may give the day count or the date it comes from
+                days = pd.to_numeric(raw[name], errors='coerce') if name in raw.columns else None
+                if column['source'] in raw.columns:
+                    from_dates = (today - pd.to_datetime(raw[column['source']], errors='coerce')).dt.days
+                    days = from_dates if days is None else days.fillna(from_dates)
+                values = days.to_numpy(dtype=np.float32, na_value=np.nan)
+            else:
+                values = pd.to_numeric(raw[name], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+            arrays[name] = values
+        return arrays
+
+    def missing(self, column, values):
+        if column['dtype'] == 'int8':
+            return values < 0
+        return np.isnan(values)
+
+    def unencoded(self, raw, arrays):
+        # (column, raw column, row mask) for cells that have a value in raw
+        # but could not be encoded: unknown category, unmapped level,
+        # unparseable number or date. Only rows missing after encoding are
+        # looked up in raw.
+        for column in self.columns:
+            sources = [name for name in dict.fromkeys([column['name'], self.source(column)])
+                       if name in raw.columns]
+            unencoded = self.missing(column, arrays[column['name']])
+            rows = np.flatnonzero(unencoded)
+            if len(rows):
+                unencoded[rows] = np.logical_or.reduce(
+                    [raw[name].iloc[rows].notna().to_numpy() for name in sources])
+            yield column, sources[0], unencoded
+
+    def unknown_counts(self, raw, arrays):
+        counts = {}
+        for column, _, unknown in self.unencoded(raw, arrays):
+            if unknown.any():
+                counts[column['name']] = int(np.count_nonzero(unknown))
+        return counts
+
+    def fill_values(self, stats, today=None):
+        # The raw-level imputation statistics encoded like any record; kept
+        # per statistics and day, since serving imputes one row at a time.
+        # The cache is swapped whole, so a reader never sees another key's fill.
+        key = (tuple(sorted(stats.items())), today or date.today())
+        cached = self._fills
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        raw = pd.DataFrame([stats]).reindex(columns=list(dict.fromkeys(
+            [*stats, *(self.source(column) for column in self.columns)])))
+        fill = {name: values[0] for name, values in self.encode_frame(raw, today).items()}
+        self._fills = (key, fill)
+        return fill
+
+    def impute(self, arrays, stats, today=None):
+        # Fill blank and unknown values with the encoded statistics. Only
+        # columns with gaps are copied, so memory-mapped columns without
+        # missing values stay zero-copy.
+        if not stats:
+            return arrays
+        fill = None
+        for column in self.columns:
+            name, values = column['name'], arrays[column['name']]
+            missing = self.missing(column, values)
+            if not missing.any():
+                continue
+            fill = fill or self.fill_values(stats, today)
+            if not self.missing(column, fill[name]):
+                arrays[name] = np.where(missing, fill[name], values).astype(values.dtype)
+        return arrays
+
+    def frame(self, arrays, index=None):
+        # The model's DataFrame view of encoded columns; categories keep their
+        # string labels so CatBoost sees the same values as in training.
+        # Values still missing after imputation are passed on as NaN.
+        data = {}
+        for column in self.columns:
+            name = column['name']
+            values = arrays[name] if index is None else arrays[name][index]
+            if column['kind'] == 'category':
+                values = pd.Categorical.from_codes(values, categories=column['values'])
+            elif column['kind'] == 'mapped' and (values < 0).any():
+                values = np.where(values < 0, np.nan, values).astype(np.float32)
+            data[name] = values
+        return pd.DataFrame(data)
+
+
+def _as_date(value):
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+SCHEMA = FeatureSchema.default()
+
+
+def model_schema(model):
+    # The schema load_model() checked the model against; models built in
+    # this process use the default one
+    return getattr(model, 'feature_schema', SCHEMA)
+
+
+def load_schema(model_path):
+    # Models saved before the schema existed use the default one
+    path = schema_path(model_path)
+    if not os.path.exists(path):
+        return SCHEMA
+    with open(path) as f:
+        return FeatureSchema(json.load(f)['columns'])
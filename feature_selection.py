@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from benchmarks import best_of
+from compact_store import DEFAULT_CHUNK_SIZE, holdout_split
+from dataset_cache import DEFAULT_CACHE_DIR, ensure_cached, load_store
+from preprocessing import CATEGORICAL_COLUMNS, FEATURE_COLUMNS
+
+DEFAULT_RESULTS = 'feature_ablation.json'
+# Largest accuracy or AUC loss that still counts as dropping a column for free
+DEFAULT_TOLERANCE = 0.002
+LATENCY_REPEATS = 200
+
+# Per-process train/eval frames and CatBoost settings, set by _init_worker
+_worker = {}
+
+
+def load_split(cache_directory):
+    # The train and eval slices of the holdout split train_model.py uses;
+    # its calibration and test slices are left alone
+    store, imputation = load_store(cache_directory)
+    store.impute(imputation)
+    rows = holdout_split(store.labels)
+    train_index, eval_index = rows['train'], rows['eval']
+    return (store.frame(train_index), store.labels[train_index]), (store.frame(eval_index), store.labels[eval_index])
+
+
+def candidate_sets(features=FEATURE_COLUMNS):
+    # The full set, then every set with one column left out
+    return [('all', list(features))] + [(f'-{name}', [column for column in features if column != name])
+                                        for name in features]
+
+
+def _init_worker(cache_directory, params, thread_count):
+    (_worker['train'], _worker['train_labels']), (_worker['eval'], _worker['eval_labels']) = \
+        load_split(cache_directory)
+    _worker['params'] = params
+    _worker['thread_count'] = thread_count
+
+
+def _run_candidate(candidate):
+    from catboost import CatBoostClassifier, Pool as DataPool
+    from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+
+    name, features = candidate
+    cat_features = [column for column in CATEGORICAL_COLUMNS if column in features]
+    train = DataPool(_worker['train'][features], _worker['train_labels'], cat_features=cat_features)
+    train.quantize()
+    model = CatBoostClassifier(**_worker['params'], thread_count=_worker['thread_count'], verbose=0)
+    start = time.perf_counter()
+    model.fit(train)
+    seconds = time.perf_counter() - start
+
+    labels = _worker['eval_labels']
+    probabilities = model.predict_proba(_worker['eval'][features])[:, 1]
+    result = {
+        'name': name,
+        'features': features,
+        'accuracy': accuracy_score(labels, probabilities >= 0.5),
+        'auc': roc_auc_score(labels, probabilities),
+        'logloss': log_loss(labels, probabilities),
+        'fit_seconds': round(seconds, 3),
+        # Sent back so inference is timed in the parent, one model at a time
+        'model': model,
+    }
+    if name == 'all':
+        evaluation = DataPool(_worker['eval'][features], labels, cat_features=cat_features)
+        result['importance'] = {
+            'prediction_values_change': dict(zip(features, model.get_feature_importance().tolist())),
+            'loss_function_change': dict(zip(features, model.get_feature_importance(
+                evaluation, type='LossFunctionChange').tolist())),
+        }
+    return result
+
+
+def measure_inference(model, frame, repeats=LATENCY_REPEATS):
+    # Batch throughput on the whole eval split and single-row latency
+    batch_seconds = best_of(lambda: model.predict_proba(frame), 3)
+    row = frame.iloc[:1]
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(row)
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return {'batch_rows_per_sec': round(len(frame) / batch_seconds), 'single_row_p50_ms': round(p50, 3),
+            'single_row_p99_ms': round(p99, 3)}
+
+
+def within_tolerance(result, full, tolerance=DEFAULT_TOLERANCE):
+    return full['accuracy'] - result['accuracy'] <= tolerance and full['auc'] - result['auc'] <= tolerance
+
+
+def cost(result, full):
+    # Larger of the accuracy and AUC losses against the full set
+    return max(full['accuracy'] - result['accuracy'], full['auc'] - result['auc'])
+
+
+def free_drops(results, tolerance=DEFAULT_TOLERANCE):
+    # Columns whose removal on its own costs at most tolerance in accuracy
+    # and AUC, cheapest first
+    full = results['all']
+    drops = [name[1:] for name, result in results.items()
+             if name.startswith('-') and within_tolerance(result, full, tolerance)]
+    return sorted(drops, key=lambda name: cost(results[f'-{name}'], full))
+
+
+def ablate(csv_path, params, workers=None, thread_count=None, tolerance=DEFAULT_TOLERANCE,
+           cache_dir=DEFAULT_CACHE_DIR, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Every candidate trains with the same thread budget. Fit times in the
+    # first round share the machine with up to `workers` other fits, so they
+    # are only a rough guide; the lean set's speed-up is measured in a pair.
+    cpus = os.cpu_count() or 1
+    workers = workers or cpus
+    thread_count = thread_count or max(1, cpus // workers)
+    directory, hit = ensure_cached(csv_path, cache_dir, chunk_size)
+    print(f"🗃️ Dataset cache {'hit' if hit else 'miss'} ({os.path.basename(directory)})")
+
+    results = {}
+    with Pool(workers, initializer=_init_worker, initargs=(directory, params, thread_count)) as pool:
+        for result in pool.imap_unordered(_run_candidate, candidate_sets()):
+            results[result['name']] = result
+            print(f"✅ {result['name']}: acc={result['accuracy']:.4f} auc={result['auc']:.4f} "
+                  f"{result['fit_seconds']:.1f}s")
+
+        # Then every free drop at once, unless that would leave nothing. The
+        # full set is fitted again next to it, so the fit speed-up compares two
+        # fits that shared the machine the same way. Drops that are free one
+        # at a time can cost more together: while the lean set misses the
+        # tolerance, the costliest drop is put back and the pair refitted.
+        drops = free_drops(results, tolerance)
+        if len(drops) == len(FEATURE_COLUMNS):
+            drops = []
+        while drops:
+            lean = [column for column in FEATURE_COLUMNS if column not in drops]
+            paired = dict((result['name'], result) for result in pool.imap_unordered(
+                _run_candidate, [('lean', lean), ('reference', list(FEATURE_COLUMNS))]))
+            result = paired['lean']
+            result['drops'] = list(drops)
+            result['reference_fit_seconds'] = paired['reference']['fit_seconds']
+            print(f"✅ lean (-{', -'.join(drops)}): acc={result['accuracy']:.4f} auc={result['auc']:.4f} "
+                  f"{result['fit_seconds']:.1f}s (full set alongside: {result['reference_fit_seconds']:.1f}s)")
+            if within_tolerance(result, results['all'], tolerance):
+                results['lean'] = result
+                break
+            print(f"⚠️ Together they cost {cost(result, results['all']):.4f}, more than {tolerance}; "
+                  f"keeping {drops[-1]}")
+            drops.pop()
+
+    _, (eval_frame, _) = load_split(directory)
+    for result in results.values():
+        result.update(measure_inference(result.pop('model'), eval_frame[result['features']]))
+    return results
+
+
+def report(results, tolerance=DEFAULT_TOLERANCE):
+    full = results['all']
+    print("📊 Feature importance (loss change on the eval split, prediction value change):")
+    importance = full['importance']
+    for name, value in sorted(importance['loss_function_change'].items(), key=lambda item: -item[1]):
+        print(f"   {name:>26}: {value:+.5f}  {importance['prediction_values_change'][name]:6.2f}")
+
+    print(f"{'set':>27} {'acc':>7} {'Δacc':>7} {'auc':>7} {'Δauc':>7} {'fit s':>6} "
+          f"{'rows/s':>9} {'p50 ms':>7}")
+    ordered = ['all'] + sorted((name for name in results if name != 'all'),
+                               key=lambda name: full['auc'] - results[name]['auc'])
+    for name in ordered:
+        result = results[name]
+        print(f"{name:>27} {result['accuracy']:7.4f} {result['accuracy'] - full['accuracy']:+7.4f} "
+              f"{result['auc']:7.4f} {result['auc'] - full['auc']:+7.4f} {result['fit_seconds']:6.1f} "
+              f"{result['batch_rows_per_sec']:9,} {result['single_row_p50_ms']:7.3f}")
+
+    if 'lean' not in results:
+        drops = free_drops(results, tolerance)
+        reason = ('every column can be dropped' if len(drops) == len(FEATURE_COLUMNS)
+                  else 'no set of free drops stays' if drops else 'no column can be dropped')
+        print(f"🧩 No lean set: {reason} within {tolerance} accuracy and AUC; keep the full set.")
+        return
+    lean = results['lean']
+    if not within_tolerance(lean, full, tolerance):
+        print(f"⚠️ The lean set costs {cost(lean, full):.4f}, more than {tolerance}; keep the full set.")
+        return
+    print(f"🧩 Dropping {', '.join(lean['drops'])}: acc {lean['accuracy'] - full['accuracy']:+.4f}, "
+          f"auc {lean['auc'] - full['auc']:+.4f}, "
+          f"fit {lean['reference_fit_seconds'] / lean['fit_seconds']:.2f}x, "
+          f"batch {lean['batch_rows_per_sec'] / full['batch_rows_per_sec']:.2f}x, "
+          f"single row {full['single_row_p50_ms'] / lean['single_row_p50_ms']:.2f}x faster")
+
+
+def main():
+    from train_model import MODEL_PARAMS
+
+    parser = argparse.ArgumentParser(description="Feature importance and parallel drop-column ablations")
+    parser.add_argument('--data', default='your_dataset.csv', help="Training CSV")
+    parser.add_argument('--workers', type=int, help="Candidate feature sets trained at the same time")
+    parser.add_argument('--threads-per-worker', type=int,
+                        help="CatBoost threads per candidate (default: cores / workers)")
+    parser.add_argument('--iterations', type=int, default=MODEL_PARAMS['iterations'])
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Accuracy/AUC a column may cost and still be dropped")
+    parser.add_argument('--output', default=DEFAULT_RESULTS, help="Write every candidate's results here (JSON)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--dataset-cache', default=DEFAULT_CACHE_DIR, metavar='DIR')
+    args = parser.parse_args()
+
+    params = {**MODEL_PARAMS, 'iterations': args.iterations}
+    start = time.perf_counter()
+    results = ablate(args.data, params, args.workers, args.threads_per_worker, args.tolerance,
+                     args.dataset_cache, args.chunk_size)
+    print(f"⏱️ {len(results)} feature sets in {time.perf_counter() - start:.1f}s")
+    report(results, args.tolerance)
+    with open(args.output, 'w') as f:
+        json.dump({'tolerance': args.tolerance, 'params': params, 'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,80 @@
+import time
+_START = time.perf_counter()
+
+import argparse
+import json
+import os
 import tkinter as tk
-from tkinter import ttk, messagebox
-from tkcalendar import Calendar
-from catboost import CatBoostClassifier
-import pandas as pd
+from tkinter import ttk, messagebox, filedialog
 from datetime import date, datetime
-import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS, observe, timer
+from feature_options import (
+    bmi_mapping, cholesterol_mapping, gender_options, country_options,
+    cancer_stage_options, yes_no_options, smoking_status_options,
+    treatment_type_options
+)
+
+# pandas, catboost and the scoring modules are imported by
+# import_inference_modules() on the loader thread once the form is drawn
+pd = preprocess = load_preprocessing = load_calibration = predict_probabilities = PredictionCache = None
+model_schema = None
+
+DEFAULT_MODEL_PATH = 'lung_cancer_survival_model.cbm'
+POLL_INTERVAL_MS = 20
+STARTUP = {'import_ms': (time.perf_counter() - _START) * 1000}
+
+
+def import_inference_modules():
+    global pd, preprocess, load_preprocessing, load_calibration, predict_probabilities, PredictionCache
+    global model_schema
+    import pandas as pd
+    from feature_schema import model_schema
+    from preprocessing import preprocess, load_preprocessing
+    from calibration import load_calibration
+    from batch_predict import predict_probabilities
+    from prediction_cache import PredictionCache
+
+
+def choose_model_path(model_path=DEFAULT_MODEL_PATH):
+    # Prefer the compiled NumPy model when it is at least as new as the .cbm;
+    # it loads in milliseconds and doesn't need the catboost runtime
+    compiled = os.path.splitext(model_path)[0] + '.npz'
+    if os.path.exists(compiled) and (not os.path.exists(model_path) or
+                                     os.path.getmtime(compiled) >= os.path.getmtime(model_path)):
+        return compiled
+    return model_path
+
+
+def warm_up_frame(model):
+    # One valid row built from the first option of every field
+    today = date.today().strftime('%Y-%m-%d')
+    return preprocess(pd.DataFrame({
+        'age': [50],
+        'gender': [gender_options[0]],
+        'country': [country_options[0]],
+        'cancer_stage': [cancer_stage_options[0]],
+        'family_history': [yes_no_options[1]],
+        'smoking_status': [smoking_status_options[0]],
+        'bmi': [list(bmi_mapping.keys())[0]],
+        'cholesterol_level': [list(cholesterol_mapping.keys())[0]],
+        'hypertension': [yes_no_options[1]],
+        'asthma': [yes_no_options[1]],
+        'cirrhosis': [yes_no_options[1]],
+        'other_cancer': [yes_no_options[1]],
+        'treatment_type': [treatment_type_options[0]],
+        'diagnosis_date': [today],
+        'end_treatment_date': [today]
+    }), schema=model_schema(model))
 
-# Mappings and options
-bmi_mapping = {'Low': 0, 'Normal': 1, 'High': 2}
-cholesterol_mapping = {'Normal': 0, 'High': 1}
-treatment_mapping = {'Surgery': 0, 'Chemotherapy': 1, 'Radiation': 2, 'Combined': 3}
-gender_options = ['Male', 'Female']
-country_options = ['USA', 'UK', 'India', 'Other']
-cancer_stage_options = ['Stage I', 'Stage II', 'Stage III', 'Stage IV']
-yes_no_options = ['Yes', 'No']
-smoking_status_options = ['Never', 'Current', 'Former']
-treatment_type_options = ['Surgery', 'Chemotherapy', 'Radiation', 'Combined']
 
 class ModernGUI:
-    def __init__(self, root):
+    def __init__(self, root, startup_report=None, registry=None, audit_db=None):
         self.root = root
+        self.startup_report = startup_report
+        self.registry = registry
+        self.audit_db = audit_db
         self.root.title("Lung Cancer Survival Prediction System")
         self.root.geometry("1200x800")
         self.root.configure(bg='#f0f0f0')
@@ -58,12 +113,39 @@ class ModernGUI:
         # Create status bar
         self.create_status_bar()
         
-        # Load model
-        self.load_model()
-        
         # Create tooltips
         self.create_tooltips()
         
+        # Load model in the background once the window has been drawn
+        self.model = None
+        self.model_path = None
+        self.imputation = {}
+        self.calibration = None
+        self.cache = None
+        self.schema = None
+        self.encoded = None
+        self.audit_log = None
+        self.watcher = None
+        self.loaded = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        
+        # Explanations get their own thread so they never queue ahead of a prediction
+        self.explain_executor = ThreadPoolExecutor(max_workers=1)
+        self.explainer = None
+        self.explained_model = None
+        
+        # Imported cohorts are scored on a third thread, away from single predictions
+        self.cohort_executor = ThreadPoolExecutor(max_workers=1)
+        self.cohort_window = None
+        self.root.bind('<Map>', self.on_first_paint)
+        
+    def on_first_paint(self, event):
+        if event.widget is not self.root:
+            return
+        self.root.unbind('<Map>')
+        STARTUP['first_paint_ms'] = (time.perf_counter() - _START) * 1000
+        self.start_model_load()
+        
     def create_header(self):
         header_frame = ttk.Frame(self.main_container)
         header_frame.pack(fill=tk.X, pady=(0, 20))
@@ -100,6 +182,14 @@ class ModernGUI:
         )
         reset_button.pack(side=tk.RIGHT, padx=5)
         
+        # Bulk import button
+        self.import_button = ttk.Button(
+            toolbar_frame,
+            text="Import CSV",
+            command=self.import_cohort
+        )
+        self.import_button.pack(side=tk.RIGHT, padx=5)
+        
     def create_scrollable_frame(self):
         # Create canvas and scrollbar
         self.canvas = tk.Canvas(self.main_container, bg='#f0f0f0', highlightthickness=0)
@@ -203,6 +293,7 @@ class ModernGUI:
                 setattr(self, var_name, var)
                 
             elif field_type == "calendar":
+                from tkcalendar import Calendar
                 calendar_frame = ttk.Frame(field_frame)
                 calendar_frame.pack(side="left", expand=True, fill="x", padx=(10, 0))
                 
@@ -235,13 +326,14 @@ class ModernGUI:
         self.progress_bar.pack(fill=tk.X, pady=(0, 10))
         
         # Predict button
-        predict_button = ttk.Button(
+        self.predict_button = ttk.Button(
             prediction_frame,
             text="Predict Survival",
             command=self.predict,
-            style='Predict.TButton'
+            style='Predict.TButton',
+            state=tk.DISABLED
         )
-        predict_button.pack(pady=10)
+        self.predict_button.pack(pady=10)
         
         # Result label
         self.result_label = ttk.Label(
@@ -252,6 +344,15 @@ class ModernGUI:
         )
         self.result_label.pack(pady=10)
         
+        # Top contributors of the last prediction, filled in off the UI thread
+        self.explanation_label = ttk.Label(
+            prediction_frame,
+            text="",
+            justify=tk.LEFT,
+            wraplength=900
+        )
+        self.explanation_label.pack(pady=(0, 10))
+        
     def create_status_bar(self):
         self.status_bar = ttk.Label(
             self.main_container,
@@ -357,23 +458,100 @@ class ModernGUI:
         
         # Reset result
         self.result_label.config(text="")
+        self.explanation_label.config(text="")
         
         # Update status
         self.status_bar.config(text="Form reset")
         
+    def start_model_load(self):
+        self.load_stage = (0, "Loading model...")
+        future = self.executor.submit(self.load_model)
+        self.root.after(POLL_INTERVAL_MS, self.poll_model_load, future)
+        
     def load_model(self):
+        # Runs on the worker thread; only reports progress through load_stage
+        self.load_stage = (20, "Loading model: importing libraries...")
+        import_inference_modules()
+        
+        if self.registry:
+            # The watcher loads the registry's current version right away
+            from model_registry import ModelRegistry, ModelWatcher
+            self.load_stage = (60, f"Loading model: reading {self.registry}...")
+            self.watcher = ModelWatcher(ModelRegistry(self.registry))
+            if self.watcher.current is None:
+                raise ValueError(f"No current model in {self.registry}")
+            loaded = self.watcher.current
+            model_path = loaded.path
+            model, imputation, calibration = loaded.model, loaded.imputation, loaded.calibration
+        else:
+            model_path = choose_model_path()
+            self.load_stage = (60, f"Loading model: reading {os.path.basename(model_path)}...")
+            from batch_predict import load_model
+            model = load_model(model_path)
+            imputation = load_preprocessing(DEFAULT_MODEL_PATH)
+            calibration = load_calibration(DEFAULT_MODEL_PATH)
+        cache = PredictionCache(model.sha256, max_entries=1000)
+        
+        # Warm up so the first click is as fast as later ones
+        self.load_stage = (90, "Loading model: warming up...")
+        model.predict_proba(warm_up_frame(model))
+        return model, imputation, calibration, cache, model_path
+        
+    def poll_model_load(self, future):
+        if not future.done():
+            progress, text = self.load_stage
+            self.progress_var.set(progress)
+            self.status_bar.config(text=text)
+            self.root.after(POLL_INTERVAL_MS, self.poll_model_load, future)
+            return
+            
+        self.progress_var.set(0)
         try:
-            self.status_bar.config(text="Loading model...")
-            self.model = CatBoostClassifier()
-            self.model.load_model('lung_cancer_survival_model.cbm')
-            self.status_bar.config(text="Model loaded successfully")
+            self.model, self.imputation, self.calibration, self.cache, self.model_path = future.result()
+            self.use_schema()
+            # Every prediction from here on is recorded (see audit_log.py)
+            from audit_log import DEFAULT_AUDIT_DB, AuditLog
+            self.audit_log = AuditLog(self.audit_db or DEFAULT_AUDIT_DB)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load model: {str(e)}")
-            self.model = None
             self.status_bar.config(text="Failed to load model")
+            return
+            
+        STARTUP['model_ready_ms'] = (time.perf_counter() - _START) * 1000
+        self.predict_button.config(state=tk.NORMAL)
+        self.status_bar.config(text="Model loaded successfully")
+        report_startup(self.startup_report)
+        
+        if self.watcher is not None:
+            # New registry versions are loaded and warmed up on the watcher thread
+            self.loaded = self.watcher.current
+            self.watcher.on_swap = lambda loaded, previous: loaded.model.predict_proba(warm_up_frame(loaded.model))
+            self.watcher.start()
             
+    def use_latest_model(self):
+        # Pick up a version the registry watcher swapped in since the last
+        # prediction; one already running keeps the model it was given
+        if self.watcher is None or self.watcher.current is self.loaded:
+            return
+        self.loaded = self.watcher.current
+        self.model, self.imputation = self.loaded.model, self.loaded.imputation
+        self.calibration = self.loaded.calibration
+        self.cache = PredictionCache(self.model.sha256, max_entries=1000)
+        self.model_path = self.loaded.path
+        self.use_schema()
+        self.status_bar.config(text=f"Switched to model {self.loaded.version}")
+        
+    def use_schema(self):
+        # The form is encoded into one preallocated row of typed arrays that
+        # every prediction reuses, with the schema the model was loaded with
+        # (see feature_schema.py)
+        self.schema = model_schema(self.model)
+        self.encoded = self.schema.allocate(1)
+        
+
     def predict(self):
         try:
+            self.prediction_started = time.perf_counter()
             self.status_bar.config(text="Validating inputs...")
             
             # Get values
@@ -424,89 +602,278 @@ class ModernGUI:
             if end_treatment_date < diagnosis_date:
                 messagebox.showerror("Error", "End treatment date cannot be before diagnosis date")
                 return
+            observe('validation', time.perf_counter() - self.prediction_started)
                 
-            # Calculate days
-            days_since_diagnosis = (date.today() - diagnosis_date).days
-            days_since_end_treatment = (date.today() - end_treatment_date).days
-            
             # Update progress
             self.progress_var.set(20)
             self.status_bar.config(text="Preparing data...")
-            self.root.update()
-            
-            # Prepare data
-            data = {
-                'age': [age],
-                'gender': [gender],
-                'country': [country],
-                'cancer_stage': [stage],
-                'family_history': [1 if family_history == 'Yes' else 0],
-                'smoking_status': [smoking_status],
-                'bmi': [bmi_mapping[bmi]],
-                'cholesterol_level': [cholesterol_mapping[cholesterol]],
-                'hypertension': [1 if hypertension == 'Yes' else 0],
-                'asthma': [1 if asthma == 'Yes' else 0],
-                'cirrhosis': [1 if cirrhosis == 'Yes' else 0],
-                'other_cancer': [1 if other_cancer == 'Yes' else 0],
-                'treatment_type': [treatment_mapping[treatment_type]],
-                'days_since_diagnosis': [days_since_diagnosis],
-                'days_since_end_treatment': [days_since_end_treatment]
+            
+            # Prepare data (same raw fields as the training CSV)
+            record = {
+                'age': age,
+                'gender': gender,
+                'country': country,
+                'cancer_stage': stage,
+                'family_history': family_history,
+                'smoking_status': smoking_status,
+                'bmi': bmi,
+                'cholesterol_level': cholesterol,
+                'hypertension': hypertension,
+                'asthma': asthma,
+                'cirrhosis': cirrhosis,
+                'other_cancer': other_cancer,
+                'treatment_type': treatment_type,
+                'diagnosis_date': diagnosis_date,
+                'end_treatment_date': end_treatment_date
             }
             
+            # Make prediction
+            if self.model is None:
+                messagebox.showerror("Error", "Model not loaded")
+                return
+                
             # Update progress
             self.progress_var.set(40)
             self.status_bar.config(text="Converting data...")
-            self.root.update()
-            
-            # Convert to DataFrame
-            input_df = pd.DataFrame(data)
             
+            # Every field is filled, so the record is encoded straight into
+            # the model's typed arrays without imputation
+            self.use_latest_model()
+            with timer('feature_encoding'):
+                self.schema.encode_records([record], self.encoded)
+            with timer('dataframe_construction'):
+                input_df = self.schema.frame(self.encoded)
+                
             # Update progress
             self.progress_var.set(60)
             self.status_bar.config(text="Making prediction...")
-            self.root.update()
             
-            # Make prediction
-            if self.model is None:
-                messagebox.showerror("Error", "Model not loaded")
-                return
-                
-            # Simulate processing time for better UX
-            time.sleep(0.5)
+            # Score on the worker thread and poll for the result from the Tk loop
+            self.predict_button.config(state=tk.DISABLED)
+            future = self.executor.submit(predict_probabilities, self.model, input_df, self.cache)
+            self.pending_explanation = (self.model, self.model_path, input_df, record)
+            self.pending_audit = (patient_id, input_df, self.model.sha256)
+            self.root.after(POLL_INTERVAL_MS, self.poll_prediction, future, self.calibration)
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+            self.status_bar.config(text="Error during prediction")
+            self.progress_var.set(0)
+            
+    def poll_prediction(self, future, calibration):
+        if not future.done():
+            self.root.after(POLL_INTERVAL_MS, self.poll_prediction, future, calibration)
+            return
+            
+        self.predict_button.config(state=tk.NORMAL)
+        try:
+            # Calibrated survival probability and the tuned operating threshold
+            probability = calibration.apply(future.result())
+            decisions = calibration.decide(probability)
+            prediction = int(decisions[0])
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred: {str(e)}")
+            self.status_bar.config(text="Error during prediction")
+            self.progress_var.set(0)
+            return
             
-            prediction = self.model.predict(input_df)[0]
+        # Only queued here; the audit log's writer thread commits it
+        patient_id, input_df, model_sha256 = self.pending_audit
+        self.audit_log.record(model_sha256, [patient_id], input_df, probability, decisions)
+        self.start_explanation(*self.pending_explanation)
+        self.show_prediction(prediction, float(probability[0]))
+        
+    def start_explanation(self, model, model_path, input_df, record):
+        self.explanation_label.config(text="Working out the main factors...")
+        future = self.explain_executor.submit(self.explain, model, model_path, input_df)
+        self.root.after(POLL_INTERVAL_MS, self.poll_explanation, future, record)
+        
+    def explain(self, model, model_path, input_df):
+        # Runs on the explanation thread; the explainer (and its cache of SHAP
+        # rows) is rebuilt only when the model changes
+        from explanations import ShapExplainer, shap_model
+        if self.explained_model is not model:
+            self.explainer = ShapExplainer(shap_model(model, model_path), max_entries=1000)
+            self.explained_model = model
+        return self.explainer.explain(input_df)[0], input_df.iloc[0], self.explainer.names
+        
+    def poll_explanation(self, future, record):
+        if not future.done():
+            self.root.after(POLL_INTERVAL_MS, self.poll_explanation, future, record)
+            return
+            
+        try:
+            shap_row, features, names = future.result()
+        except Exception as e:
+            self.explanation_label.config(text=f"Explanation unavailable: {str(e)}")
+            return
             
+        # Show the values as entered on the form where there is one
+        from explanations import top_contributors
+        display = {name: record.get(name, features[name]) for name in features.index}
+        lines = [f"{'▲' if contribution >= 0 else '▼'} {name.replace('_', ' ')}: {value} "
+                 f"({contribution:+.2f})"
+                 for name, value, contribution in top_contributors(shap_row, display, names)]
+        self.explanation_label.config(
+            text="Main factors (▲ toward survival, ▼ against, in log-odds):\n" + "\n".join(lines))
+        
+    def show_prediction(self, prediction, probability):
+        with timer('result_rendering'):
             # Update progress
             self.progress_var.set(100)
             self.status_bar.config(text="Prediction complete")
-            self.root.update()
             
             # Update result with animation
             self.result_label.config(
-                text="✅ Patient SURVIVED ✅" if prediction == 1 else "❌ Patient DID NOT SURVIVE ❌",
+                text=("✅ Patient SURVIVED ✅" if prediction == 1 else "❌ Patient DID NOT SURVIVE ❌") +
+                     f"\nSurvival probability: {probability:.1%}",
                 foreground="green" if prediction == 1 else "red"
             )
+            self.root.update_idletasks()
+        observe('gui_prediction', time.perf_counter() - self.prediction_started)
+        
+        # Reset progress bar after a delay
+        self.root.after(2000, lambda: self.progress_var.set(0))
+        
+        # Show detailed message
+        if prediction == 1:
+            messagebox.showinfo("Prediction Result", 
+                "The model predicts that the patient is likely to survive "
+                f"(survival probability {probability:.1%}).\n\n"
+                "This prediction is based on the provided medical information and treatment history.")
+        else:
+            messagebox.showinfo("Prediction Result", 
+                "The model predicts that the patient may not survive "
+                f"(survival probability {probability:.1%}).\n\n"
+                "This prediction is based on the provided medical information and treatment history.\n"
+                "Please consult with healthcare professionals for proper medical advice.")
+                
+    def import_cohort(self):
+        if self.model is None:
+            messagebox.showerror("Error", "Model not loaded")
+            return
+        path = filedialog.askopenfilename(
+            title="Import patients",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
             
-            # Show detailed message
-            if prediction == 1:
-                messagebox.showinfo("Prediction Result", 
-                    "The model predicts that the patient is likely to survive.\n\n"
-                    "This prediction is based on the provided medical information and treatment history.")
-            else:
-                messagebox.showinfo("Prediction Result", 
-                    "The model predicts that the patient may not survive.\n\n"
-                    "This prediction is based on the provided medical information and treatment history.\n"
-                    "Please consult with healthcare professionals for proper medical advice.")
+        self.use_latest_model()
+        self.import_button.config(state=tk.DISABLED)
+        self.status_bar.config(text=f"Scoring {os.path.basename(path)}...")
+        future = self.cohort_executor.submit(
+            self.score_cohort_file, path, self.model, self.imputation, self.calibration,
+            self.audit_log.for_model(self.model.sha256))
+        self.root.after(POLL_INTERVAL_MS, self.poll_cohort, future, path)
+        
+    def score_cohort_file(self, path, model, imputation, calibration, audit):
+        # Runs on the cohort thread: read, validate and score in one batch
+        from cohort import score_cohort
+        with timer('csv_read'):
+            raw = pd.read_csv(path)
+        return score_cohort(model, raw, imputation, calibration, audit=audit)
+        
+    def poll_cohort(self, future, path):
+        if not future.done():
+            self.root.after(POLL_INTERVAL_MS, self.poll_cohort, future, path)
+            return
             
-            # Reset progress bar after a delay
-            self.root.after(2000, lambda: self.progress_var.set(0))
+        self.import_button.config(state=tk.NORMAL)
+        try:
+            result = future.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not import {os.path.basename(path)}: {str(e)}")
+            self.status_bar.config(text="Import failed")
+            return
+            
+        self.show_cohort(result, path)
+        
+    def show_cohort(self, result, path):
+        from cohort import SUMMARY_COLUMNS
+        from virtual_table import VirtualTable
+        
+        if self.cohort_window is None or not self.cohort_window.winfo_exists():
+            self.cohort_window = tk.Toplevel(self.root)
+            self.cohort_window.geometry("1100x650")
+            
+            self.cohort_summary = ttk.Label(self.cohort_window, text="", padding=10)
+            self.cohort_summary.pack(fill=tk.X)
+            
+            self.cohort_table = VirtualTable(
+                self.cohort_window,
+                ['id', *SUMMARY_COLUMNS, 'probability', 'prediction', 'error'],
+                formatters={'probability': lambda value: f"{value:.1%}"}
+            )
+            self.cohort_table.pack(fill=tk.BOTH, expand=True, padx=10)
+            
+            export_button = ttk.Button(
+                self.cohort_window,
+                text="Export CSV",
+                command=self.export_cohort
+            )
+            export_button.pack(pady=10)
             
+        self.cohort_window.title(f"Cohort results - {os.path.basename(path)}")
+        self.cohort_table.set_frame(result)
+        
+        scored = result['probability'].notna()
+        self.cohort_summary.config(
+            text=f"{len(result)} patients: {int(scored.sum())} scored, "
+                 f"{int((~scored).sum())} rejected (see Error column), "
+                 f"{int((result['prediction'] == 'SURVIVED').sum())} predicted to survive. "
+                 f"Click a column header to sort."
+        )
+        self.status_bar.config(text=f"Scored {int(scored.sum())} of {len(result)} imported patients")
+        self.cohort_window.lift()
+        
+    def export_cohort(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.cohort_window,
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")]
+        )
+        if not path:
+            return
+        # Rows are written in the order currently shown
+        future = self.cohort_executor.submit(self.cohort_table.ordered().to_csv, path, index=False)
+        self.root.after(POLL_INTERVAL_MS, self.poll_export, future, path)
+        
+    def poll_export(self, future, path):
+        if not future.done():
+            self.root.after(POLL_INTERVAL_MS, self.poll_export, future, path)
+            return
+        try:
+            future.result()
         except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-            self.status_bar.config(text="Error during prediction")
-            self.progress_var.set(0)
+            messagebox.showerror("Error", f"Could not export: {str(e)}")
+            return
+        self.status_bar.config(text=f"Exported cohort results to {path}")
+
+
+def report_startup(path=None):
+    print(f"⏱️ Startup: imports {STARTUP['import_ms']:.0f}ms, "
+          f"first paint {STARTUP.get('first_paint_ms', 0):.0f}ms, "
+          f"model ready {STARTUP.get('model_ready_ms', 0):.0f}ms")
+    if path:
+        with open(path, 'a') as f:
+            f.write(json.dumps(dict(STARTUP, timestamp=time.time())) + '\n')
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lung Cancer Survival Prediction System")
+    parser.add_argument('--startup-report', help="Append startup timings as a JSON line to this file")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="Write prediction stage timings here on exit (.prom for Prometheus text, otherwise JSON)")
+    parser.add_argument('--registry', metavar='DIR',
+                        help="Use the registry's current model and switch when a new version is activated")
+    parser.add_argument('--audit-db', metavar='PATH',
+                        help="Audit log every prediction is appended to (default: prediction_audit.sqlite)")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = ModernGUI(root)
-    root.mainloop() 
\ No newline at end of file
+    app = ModernGUI(root, startup_report=args.startup_report, registry=args.registry,
+                    audit_db=args.audit_db)
+    root.mainloop()
+    if args.metrics:
+        METRICS.export(args.metrics) 
\ No newline at end of file
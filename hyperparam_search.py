@@ -0,0 +1,153 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import time
+from itertools import product
+from multiprocessing import Pool
+
+from compact_store import DEFAULT_CHUNK_SIZE, holdout_split
+from dataset_cache import DEFAULT_CACHE_DIR, ensure_cached, load_store
+
+DEFAULT_SPACE = {
+    'depth': [4, 5, 6, 7, 8],
+    'learning_rate': [0.03, 0.05, 0.1, 0.2],
+    'l2_leaf_reg': [1, 3, 5, 10],
+    'bagging_temperature': [0, 0.5, 1],
+}
+DEFAULT_RESULTS = 'search_results.jsonl'
+# Bump when the stored metrics change meaning so older trials are rerun
+RESULTS_VERSION = 3
+
+# Per-process training data and CatBoost thread budget, set by _init_worker
+_worker = {}
+
+
+def sample_trials(space, n_trials, seed=42):
+    names = sorted(space)
+    grid = [dict(zip(names, values)) for values in product(*(space[name] for name in names))]
+    random.Random(seed).shuffle(grid)
+    return grid[:n_trials]
+
+
+def trial_key(params, data_key, iterations, early_stopping_rounds):
+    config = {'params': params, 'data': data_key, 'iterations': iterations,
+              'early_stopping_rounds': early_stopping_rounds, 'version': RESULTS_VERSION}
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {result['key']: result for result in map(json.loads, f) if result}
+
+
+def _init_worker(cache_directory, thread_count):
+    # Every worker memory-maps the same cached columns, so the OS page cache
+    # holds one copy of the data however many trials run at once. Trials
+    # stop early on the eval slice train_model.py picks its best iteration
+    # on; the calibration and test slices are never seen.
+    store, imputation = load_store(cache_directory)
+    store.impute(imputation)
+    rows = holdout_split(store.labels)
+    _worker['train'] = store.pool(rows['train'], quantize=True)
+    _worker['eval'] = store.pool(rows['eval'])
+    _worker['thread_count'] = thread_count
+
+
+def _run_trial(trial):
+    from catboost import CatBoostClassifier
+
+    key, params, iterations, early_stopping_rounds = trial
+    model = CatBoostClassifier(
+        iterations=iterations,
+        loss_function='Logloss',
+        # Accuracy plateaus at the majority class early on, so trials stop on
+        # the smoother Logloss and report Accuracy/AUC at the best iteration
+        eval_metric='Logloss',
+        custom_metric=['Accuracy', 'AUC'],
+        random_seed=42,
+        thread_count=_worker['thread_count'],
+        early_stopping_rounds=early_stopping_rounds,
+        verbose=0,
+        **params
+    )
+    start = time.perf_counter()
+    model.fit(_worker['train'], eval_set=_worker['eval'])
+    # Every metric at the iteration that was kept (get_best_score() would give
+    # each metric's own best, possibly from different iterations)
+    best_iteration = model.get_best_iteration()
+    scores = {metric: values[best_iteration]
+              for metric, values in model.get_evals_result()['validation'].items()}
+    return {
+        'key': key,
+        'params': params,
+        'accuracy': scores['Accuracy'],
+        'auc': scores.get('AUC'),
+        'logloss': scores['Logloss'],
+        'best_iteration': best_iteration,
+        'trees': model.tree_count_,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def search(csv_path, n_trials, workers, thread_count, iterations=500, early_stopping_rounds=50,
+           results_path=DEFAULT_RESULTS, cache_dir=DEFAULT_CACHE_DIR, space=DEFAULT_SPACE,
+           chunk_size=DEFAULT_CHUNK_SIZE):
+    # Build (or reuse) the memory-mapped dataset once in the parent process
+    directory, hit = ensure_cached(csv_path, cache_dir, chunk_size)
+    data_key = os.path.basename(directory)
+    print(f"🗃️ Dataset cache {'hit' if hit else 'miss'} ({data_key})")
+
+    # Trials already in the results store for this dataset are skipped
+    done = load_results(results_path)
+    trials, results = [], []
+    for params in sample_trials(space, n_trials):
+        key = trial_key(params, data_key, iterations, early_stopping_rounds)
+        if key in done:
+            results.append(done[key])
+        else:
+            trials.append((key, params, iterations, early_stopping_rounds))
+    print(f"🔎 {len(trials)} trials to run, {len(results)} already in {results_path}")
+
+    if trials:
+        with Pool(workers, initializer=_init_worker, initargs=(directory, thread_count)) as pool:
+            with open(results_path, 'a') as f:
+                for result in pool.imap_unordered(_run_trial, trials):
+                    f.write(json.dumps(result) + '\n')
+                    f.flush()
+                    results.append(result)
+                    print(f"✅ acc={result['accuracy']:.4f} trees={result['trees']} "
+                          f"{result['seconds']:.1f}s {result['params']}")
+    return sorted(results, key=lambda result: (result['accuracy'], result['auc'] or 0), reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel CatBoost hyperparameter search")
+    parser.add_argument('--data', default='your_dataset.csv', help="Training CSV")
+    parser.add_argument('--trials', type=int, default=20, help="Configurations sampled from the grid")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="Trials trained at the same time")
+    parser.add_argument('--threads-per-worker', type=int,
+                        help="CatBoost threads per trial (default: cores / workers)")
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--early-stopping-rounds', type=int, default=50,
+                        help="Stop a trial once the eval Logloss hasn't improved for this many rounds")
+    parser.add_argument('--results', default=DEFAULT_RESULTS, help="JSON-lines store of finished trials")
+    parser.add_argument('--dataset-cache', default=DEFAULT_CACHE_DIR, metavar='DIR')
+    args = parser.parse_args()
+
+    thread_count = args.threads_per_worker or max(1, (os.cpu_count() or 1) // args.workers)
+    start = time.perf_counter()
+    results = search(args.data, args.trials, args.workers, thread_count, args.iterations,
+                     args.early_stopping_rounds, args.results, args.dataset_cache)
+    print(f"⏱️ Search finished in {time.perf_counter() - start:.1f}s")
+    for rank, result in enumerate(results[:5], 1):
+        print(f"{rank}. acc={result['accuracy']:.4f} auc={result['auc']:.4f} "
+              f"iter={result['best_iteration']} {result['params']}")
+
+
+if __name__ == "__main__":
+    main()
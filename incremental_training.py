@@ -0,0 +1,84 @@
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+
+TAIL_BYTES = 4096
+
+
+def watermark_path(model_path):
+    return os.path.splitext(model_path)[0] + '_watermark.json'
+
+
+def load_watermark(model_path):
+    path = watermark_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_watermark(watermark, model_path):
+    with open(watermark_path(model_path), 'w') as f:
+        json.dump(watermark, f, indent=2)
+
+
+def _tail_hash(f, offset):
+    # Fingerprint of the bytes just before offset, to notice a rewritten file
+    f.seek(max(0, offset - TAIL_BYTES))
+    return hashlib.sha1(f.read(min(offset, TAIL_BYTES))).hexdigest()
+
+
+def _complete_lines_end(f, size):
+    # Offset just past the last newline, so a row still being appended is
+    # left for the next run
+    start = max(0, size - TAIL_BYTES)
+    while True:
+        f.seek(start)
+        newline = f.read(size - start).rfind(b'\n')
+        if newline >= 0 or start == 0:
+            return start + newline + 1
+        start = max(0, start - TAIL_BYTES)
+
+
+def file_watermark(csv_path, max_id=None):
+    # Everything currently in the file counts as seen
+    with open(csv_path, 'rb') as f:
+        offset = _complete_lines_end(f, os.path.getsize(csv_path))
+        tail = _tail_hash(f, offset)
+    if max_id is None:
+        columns = pd.read_csv(csv_path, nrows=0).columns
+        if 'id' in columns:
+            max_id = max((int(chunk['id'].max()) for chunk in
+                          pd.read_csv(csv_path, usecols=['id'], chunksize=1_000_000)), default=None)
+    return {'offset': offset, 'tail_sha1': tail, 'max_id': max_id}
+
+
+def read_new_rows(csv_path, watermark):
+    # Rows appended since watermark. When the file only grew, just the bytes
+    # after the stored offset are parsed; if it was rewritten, fall back to
+    # scanning for ids above the stored maximum.
+    columns = pd.read_csv(csv_path, nrows=0).columns
+    with open(csv_path, 'rb') as f:
+        end = _complete_lines_end(f, os.path.getsize(csv_path))
+        offset = watermark['offset']
+        if offset <= end and _tail_hash(f, offset) == watermark['tail_sha1']:
+            f.seek(offset)
+            data = f.read(end - offset)
+            rows = pd.read_csv(io.BytesIO(data), header=None, names=columns) if data.strip() \
+                else pd.DataFrame(columns=columns)
+        elif watermark.get('max_id') is not None and 'id' in columns:
+            print("⚠️ Training file was rewritten; selecting new rows by id")
+            rows = pd.concat(chunk[chunk['id'] > watermark['max_id']]
+                             for chunk in pd.read_csv(csv_path, chunksize=200_000))
+        else:
+            raise ValueError(f"{csv_path} changed since the last run and has no id column; "
+                             f"run a full rebuild instead")
+        tail = _tail_hash(f, end)
+
+    max_id = watermark.get('max_id')
+    if 'id' in rows.columns and len(rows):
+        max_id = max(int(rows['id'].max()), max_id if max_id is not None else int(rows['id'].max()))
+    return rows, {'offset': end, 'tail_sha1': tail, 'max_id': max_id}
@@ -0,0 +1,145 @@
+import argparse
+import json
+import threading
+import time
+from bisect import bisect_left
+
+# Histogram upper bounds in seconds, from 10µs to 30s
+BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = 'lung_cancer'
+
+
+class Histogram:
+    # Fixed buckets so observing is a bisect and three additions
+    __slots__ = ('counts', 'sum', 'count', '_lock')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'count': self.count, 'sum': self.sum, 'buckets': list(self.counts)}
+
+
+class Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Metrics:
+    # Stage timings and counters for one process
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, Histogram())
+        return histogram
+
+    def timer(self, stage):
+        return Timer(self.histogram(stage))
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        return {'buckets': list(BUCKETS),
+                'stages': {stage: histogram.snapshot() for stage, histogram in self.stages.items()},
+                'counters': dict(self.counters)}
+
+    def to_prometheus(self):
+        lines = [f'# TYPE {PREFIX}_stage_seconds histogram']
+        for stage, histogram in sorted(self.snapshot()['stages'].items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), histogram['buckets']):
+                cumulative += count
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'# TYPE {PREFIX}_{name}_total counter')
+            lines.append(f'{PREFIX}_{name}_total {value}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path):
+        # .prom/.txt files get Prometheus text format, anything else JSON
+        with open(path, 'w') as f:
+            if path.endswith(('.prom', '.txt')):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.snapshot(), f, indent=2)
+
+    def report(self):
+        for stage, histogram in sorted(self.snapshot()['stages'].items()):
+            mean = histogram['sum'] / histogram['count'] * 1000 if histogram['count'] else 0
+            print(f"⏱️ {stage:>24}: {histogram['count']:>8} calls, {mean:>10.3f}ms mean")
+
+
+# Shared by every module in the process
+METRICS = Metrics()
+timer = METRICS.timer
+observe = METRICS.observe
+increment = METRICS.increment
+
+
+def timed(iterable, stage):
+    # Times how long each item takes to produce, e.g. chunks read from a CSV
+    iterator = iter(iterable)
+    histogram = METRICS.histogram(stage)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        histogram.observe(time.perf_counter() - start)
+        yield item
+
+
+def measure_overhead(calls=200_000):
+    # Microseconds added by one timed block around nothing
+    metrics = Metrics()
+    start = time.perf_counter()
+    for _ in range(calls):
+        with metrics.timer('overhead'):
+            pass
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the per-call cost of stage timing")
+    parser.add_argument('--calls', type=int, default=200_000)
+    args = parser.parse_args()
+    print(f"⏱️ {measure_overhead(args.calls):.2f}µs per timed stage")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import weakref
+from datetime import datetime
+
+from calibration import calibration_path, load_calibration
+from drift import profile_path
+from feature_schema import load_schema, schema_path
+from prediction_cache import file_hash
+from preprocessing import load_preprocessing, preprocessing_path
+
+DEFAULT_REGISTRY = 'model_registry'
+MODEL_FILE = 'model.cbm'
+POLL_INTERVAL = 2.0
+# Files saved next to a model that are published with it
+SIDECARS = (preprocessing_path, calibration_path, schema_path, profile_path)
+
+
+def bundle_hash(model_path):
+    # The model file and its sidecars together, so republishing a model with
+    # a new calibration or profile makes a new version
+    parts = [file_hash(model_path)] + [file_hash(sidecar(model_path)) if os.path.exists(sidecar(model_path)) else ''
+                                      for sidecar in SIDECARS]
+    return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+
+class ModelRegistry:
+    # One directory per version (model, preprocessing stats, metadata.json)
+    # and a CURRENT file naming the active version. CURRENT is replaced
+    # atomically, so readers see either the old or the new version.
+    def __init__(self, root=DEFAULT_REGISTRY):
+        self.root = root
+        os.makedirs(os.path.join(root, 'versions'), exist_ok=True)
+
+    @property
+    def current_path(self):
+        return os.path.join(self.root, 'CURRENT')
+
+    def version_dir(self, version):
+        return os.path.join(self.root, 'versions', version)
+
+    def model_path(self, version):
+        return os.path.join(self.version_dir(version), MODEL_FILE)
+
+    def versions(self):
+        # Only complete versions; metadata.json is the last file written
+        return sorted(version for version in os.listdir(os.path.join(self.root, 'versions'))
+                      if os.path.exists(os.path.join(self.version_dir(version), 'metadata.json')))
+
+    def metadata(self, version):
+        with open(os.path.join(self.version_dir(version), 'metadata.json')) as f:
+            return json.load(f)
+
+    def current(self):
+        try:
+            with open(self.current_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def activate(self, version):
+        if not os.path.exists(self.model_path(version)):
+            raise ValueError(f"Unknown model version {version}")
+        tmp = f'{self.current_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(version)
+        os.replace(tmp, self.current_path)
+
+    def find(self, bundle_sha256):
+        # Versions registered before bundle hashes were recorded never match
+        for version in self.versions():
+            if self.metadata(version).get('bundle_sha256') == bundle_sha256:
+                return version
+        return None
+
+    def publish(self, model_path, metrics=None, params=None, activate=True):
+        # Identical models with identical sidecars are registered once
+        version = self.find(bundle_hash(model_path))
+        if version is None:
+            version = self._create_version(model_path, metrics, params)
+        if activate:
+            self.activate(version)
+        return version
+
+    def _create_version(self, model_path, metrics, params):
+        # os.mkdir is atomic, so concurrent publishers never share a number
+        while True:
+            version = f"v{len(os.listdir(os.path.join(self.root, 'versions'))) + 1:04d}"
+            try:
+                os.mkdir(self.version_dir(version))
+                break
+            except FileExistsError:
+                continue
+        directory = self.version_dir(version)
+        shutil.copyfile(model_path, os.path.join(directory, MODEL_FILE))
+        for sidecar in SIDECARS:
+            if os.path.exists(sidecar(model_path)):
+                shutil.copyfile(sidecar(model_path), sidecar(self.model_path(version)))
+        # Hashed from the copies, so the version describes exactly what it holds.
+        # sha256 is the .cbm alone, the hash the audit log records.
+        metadata = {'version': version, 'sha256': file_hash(self.model_path(version)),
+                    'bundle_sha256': bundle_hash(self.model_path(version)), 'source': os.path.abspath(model_path),
+                    'created': datetime.now().isoformat(timespec='seconds'),
+                    'feature_schema': load_schema(model_path).to_dict(), 'metrics': metrics or {}, 'params': params or {}}
+        # metadata.json is written last; its presence marks a complete version
+        with open(os.path.join(directory, 'metadata.json.tmp'), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(os.path.join(directory, 'metadata.json.tmp'), os.path.join(directory, 'metadata.json'))
+        return version
+
+
+class LoadedModel:
+    # A model together with the imputation statistics it was trained with
+    # and its calibration
+    def __init__(self, version, sha256, path, model, imputation, calibration):
+        self.version = version
+        self.sha256 = sha256
+        self.path = path
+        self.model = model
+        self.imputation = imputation
+        self.calibration = calibration
+
+
+# Models already loaded in this process, by content hash; entries disappear
+# once no watcher or in-flight prediction holds them
+_loaded = weakref.WeakValueDictionary()
+_loaded_lock = threading.Lock()
+
+
+def load_version(registry, version):
+    from batch_predict import load_model
+
+    metadata = registry.metadata(version)
+    sha256 = metadata['sha256']
+    # Keyed on the bundle: the same .cbm with another calibration or
+    # imputation is a different model to serve
+    key = metadata.get('bundle_sha256', sha256)
+    with _loaded_lock:
+        loaded = _loaded.get(key)
+        if loaded is None:
+            path = registry.model_path(version)
+            loaded = LoadedModel(version, sha256, path, load_model(path), load_preprocessing(path),
+                                 load_calibration(path))
+            _loaded[key] = loaded
+    return loaded
+
+
+class ModelWatcher:
+    # Polls CURRENT on a daemon thread and swaps the active model once the new
+    # one is fully loaded. Callers read .current once per prediction, so
+    # in-flight work finishes on the model it started with.
+    def __init__(self, registry, poll_interval=POLL_INTERVAL, on_swap=None):
+        self.registry = registry
+        self.poll_interval = poll_interval
+        self.on_swap = on_swap
+        self.current = None
+        self._current_stat = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.check()
+
+    def check(self):
+        # Returns True when a different model was swapped in
+        try:
+            stat = os.stat(self.registry.current_path)
+        except FileNotFoundError:
+            return False
+        stat = (stat.st_mtime_ns, stat.st_size)
+        if stat == self._current_stat:
+            return False
+        self._current_stat = stat
+        version = self.registry.current()
+        if self.current is not None and self.current.version == version:
+            return False
+        loaded = load_version(self.registry, version)
+        if self.current is not None and loaded is self.current:
+            return False
+        previous, self.current = self.current, loaded
+        if self.on_swap is not None:
+            self.on_swap(loaded, previous)
+        return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:
+                # Keep serving the current model if the new one can't be loaded
+                print(f"⚠️ Model reload failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry")
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY, help="Registry directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish = commands.add_parser('publish', help="Register a trained model")
+    publish.add_argument('model', help="CatBoost model file (its _preprocessing.json and _schema.json are copied too)")
+    publish.add_argument('--no-activate', action='store_true', help="Register without making it current")
+    activate = commands.add_parser('activate', help="Make a registered version current (or roll back)")
+    activate.add_argument('version')
+    commands.add_parser('list', help="Show registered versions")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == 'publish':
+        version = registry.publish(args.model, activate=not args.no_activate)
+        print(f"💾 Registered {args.model} as {version}")
+    elif args.command == 'activate':
+        registry.activate(args.version)
+        print(f"✅ {args.version} is now current")
+    else:
+        current = registry.current()
+        for version in registry.versions():
+            metadata = registry.metadata(version)
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version} {metadata['created']} {metadata['sha256'][:12]} {metadata['metrics']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import os
+import time
+from multiprocessing import Pool, shared_memory
+
+import pandas as pd
+
+from batch_predict import DEFAULT_MODEL_PATH, DEFAULT_CHUNK_SIZE, load_model, report_invalid, score_frame
+from calibration import load_calibration
+from preprocessing import load_preprocessing
+
+# Per-process model, imputation statistics and calibration, set once by _init_worker
+_worker_model = None
+_worker_imputation = None
+_worker_calibration = None
+
+
+def _init_worker(model_path, shm_name, size, imputation, calibration):
+    # Every worker deserializes the model once from the shared buffer instead
+    # of re-reading the file for each task
+    global _worker_model, _worker_imputation, _worker_calibration
+    _worker_imputation = imputation
+    _worker_calibration = calibration
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        _worker_model = load_model(model_path, blob=bytes(shm.buf[:size]))
+    finally:
+        shm.close()
+
+
+def _score_shard(shard):
+    # One CatBoost thread per worker so processes don't oversubscribe the cores
+    return score_frame(_worker_model, shard, _worker_imputation, thread_count=1,
+                       calibration=_worker_calibration)
+
+
+class ParallelScorer:
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, workers=None):
+        self.workers = workers or os.cpu_count()
+        with open(model_path, 'rb') as f:
+            blob = f.read()
+        self._shm = shared_memory.SharedMemory(create=True, size=len(blob))
+        self._shm.buf[:len(blob)] = blob
+        self._pool = Pool(self.workers, initializer=_init_worker,
+                          initargs=(model_path, self._shm.name, len(blob),
+                                    load_preprocessing(model_path), load_calibration(model_path)))
+
+    def score(self, raw, shard_size=None):
+        # Split into one shard per worker by default; imap keeps input order
+        if shard_size is None:
+            shard_size = max(1, -(-len(raw) // self.workers))
+        shards = [raw.iloc[i:i + shard_size] for i in range(0, len(raw), shard_size)]
+        return pd.concat(self._pool.imap(_score_shard, shards))
+
+    def score_csv(self, input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE):
+        total_rows = 0
+        for chunk_number, chunk in enumerate(pd.read_csv(input_path, chunksize=chunk_size)):
+            result = self.score(chunk)
+            result.to_csv(output_path, mode='w' if chunk_number == 0 else 'a',
+                          header=chunk_number == 0, index=False)
+            report_invalid(result)
+            total_rows += len(chunk)
+        return total_rows
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark(model_path, n_rows, max_workers, repeats=3):
+    from synthetic_data import make_patients
+
+    raw = make_patients(n_rows)
+    print(f"⏱️ Scoring {n_rows} synthetic rows, best of {repeats}")
+    print(f"{'workers':>8} {'rows/sec':>12} {'speedup':>8}")
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        with ParallelScorer(model_path, workers) as scorer:
+            scorer.score(raw.iloc[:workers])  # Warm up every worker
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                scorer.score(raw)
+                timings.append(time.perf_counter() - start)
+        rate = n_rows / min(timings)
+        baseline = baseline or rate
+        print(f"{workers:>8} {rate:>12,.0f} {rate / baseline:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV across several worker processes")
+    parser.add_argument('input', nargs='?', help="CSV with the same fields the GUI form collects")
+    parser.add_argument('output', nargs='?', help="CSV to write predictions and probabilities to")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="CatBoost model file")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Rows read per chunk, split across the workers")
+    parser.add_argument('--benchmark', type=int, metavar='ROWS',
+                        help="Measure rows/sec from 1 to --workers processes instead of scoring a file")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.model, args.benchmark, args.workers)
+        return
+    if not (args.input and args.output):
+        parser.error("input and output are required unless --benchmark is given")
+
+    start = time.perf_counter()
+    with ParallelScorer(args.model, args.workers) as scorer:
+        total_rows = scorer.score_csv(args.input, args.output, args.chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Scored {total_rows} rows with {args.workers} workers in {elapsed:.2f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+SQLITE_BATCH = 500
+
+
+def row_keys(features):
+    # Canonical 64-bit hash per encoded feature row, independent of the index
+    # and of how columns happen to be typed: categories hash by label (the
+    # same as plain strings) and numbers as float32, so a row from a CSV, the
+    # compact store or the GUI form gets one key
+    columns = {name: values if isinstance(values.dtype, pd.CategoricalDtype) or not is_numeric_dtype(values)
+               else values.to_numpy(dtype=np.float32)
+               for name, values in features.items()}
+    return pd.util.hash_pandas_object(pd.DataFrame(columns, copy=False), index=False).to_numpy().view(np.int64)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    # Bounded LRU of probabilities keyed on row_keys(), with an optional
+    # SQLite tier. Entries are tied to the content hash of the model they
+    # were computed with (model.sha256, fixed by load_model), so a retrained
+    # model never sees stale results.
+    def __init__(self, model_sha256, max_entries=100_000, persist_path=None):
+        self.model_sha256 = model_sha256
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "model TEXT, key INTEGER, probability REAL, PRIMARY KEY (model, key))")
+
+    def get_many(self, keys):
+        # Probabilities for keys, NaN where not cached
+        with self._lock:
+            result = np.full(len(keys), np.nan)
+            for i, key in enumerate(keys.tolist()):
+                probability = self._entries.get(key)
+                if probability is not None:
+                    self._entries.move_to_end(key)
+                    result[i] = probability
+
+            missing = np.flatnonzero(np.isnan(result))
+            if self._db is not None and len(missing):
+                found = self._load(keys[missing].tolist())
+                for i in missing:
+                    probability = found.get(int(keys[i]))
+                    if probability is not None:
+                        result[i] = probability
+                        self._remember(int(keys[i]), probability)
+
+            hits = int(np.count_nonzero(~np.isnan(result)))
+            self.hits += hits
+            self.misses += len(keys) - hits
+            return result
+
+    def put_many(self, keys, probabilities):
+        with self._lock:
+            pairs = list(zip(keys.tolist(), np.asarray(probabilities, dtype=float).tolist()))
+            for key, probability in pairs:
+                self._remember(key, probability)
+            if self._db is not None:
+                with self._db:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                        [(self.model_sha256, key, probability) for key, probability in pairs])
+
+    def _remember(self, key, probability):
+        self._entries[key] = probability
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, keys):
+        found = {}
+        for start in range(0, len(keys), SQLITE_BATCH):
+            batch = keys[start:start + SQLITE_BATCH]
+            rows = self._db.execute(
+                f"SELECT key, probability FROM predictions WHERE model = ? "
+                f"AND key IN ({','.join('?' * len(batch))})",
+                [self.model_sha256, *batch])
+            found.update(rows)
+        return found
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self._entries),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
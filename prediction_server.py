@@ -0,0 +1,338 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from batch_predict import DEFAULT_MODEL_PATH, load_model, score_features
+from calibration import IDENTITY, load_calibration
+from drift import DriftMonitor, load_profile
+from feature_schema import model_schema
+from metrics import METRICS, observe, timer
+from preprocessing import load_preprocessing, missing_fields, preprocess_checked
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class InvalidRows(ValueError):
+    # Validation messages by position in a /predict/batch request
+    def __init__(self, rows):
+        super().__init__(f"{len(rows)} invalid rows")
+        self.rows = rows
+
+
+def _score(active, records, all_or_nothing=False):
+    # Runs on the executor; active is one (model, imputation, calibration,
+    # drift monitor, audit) snapshot. Invalid records get an error and no
+    # score, or with all_or_nothing nothing is scored (or audited) at all.
+    model, imputation, calibration, monitor, audit = active
+    schema = model_schema(model)
+    # Absent fields are checked per record: in the shared frame they would
+    # be NaN, and imputed, whenever another record in the batch has them
+    absent = [missing_fields(record, schema) for record in records]
+    raw = pd.DataFrame.from_records(records)
+    raw = raw.reindex(columns=[*raw.columns, *missing_fields(raw.columns, schema)])
+    features, errors = preprocess_checked(raw, imputation, schema=schema)
+    errors = pd.Series([f"missing {', '.join(fields)}" + (f"; {error}" if error else '') if fields else error
+                        for fields, error in zip(absent, errors)], index=errors.index, dtype=object)
+    invalid = np.flatnonzero((errors != '').to_numpy())
+    if all_or_nothing and len(invalid):
+        raise InvalidRows({int(i): errors.iloc[i] for i in invalid})
+    # Ids are echoed back as sent, None where a record has none
+    ids = np.array([record.get('id') for record in records], dtype=object) if 'id' in raw.columns else None
+    return score_features(model, features, errors, ids, calibration=calibration, monitor=monitor, audit=audit)
+
+
+def drift_monitor(model_path):
+    # None for models saved without a reference profile
+    profile = load_profile(model_path) if model_path else None
+    return DriftMonitor(profile) if profile is not None else None
+
+
+class LatencyStats:
+    def __init__(self, window=10_000):
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.batches = 0
+
+    def record_latency(self, seconds):
+        self.requests += 1
+        self.latencies.append(seconds)
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batch_sizes.append(size)
+
+    def snapshot(self):
+        stats = {'requests': self.requests, 'batches': self.batches}
+        if self.latencies:
+            p50, p99 = np.percentile(self.latencies, [50, 99])
+            stats['latency_ms'] = {'p50': round(p50 * 1000, 3), 'p99': round(p99 * 1000, 3)}
+        if self.batch_sizes:
+            sizes = np.asarray(self.batch_sizes)
+            stats['batch_size'] = {'mean': round(float(sizes.mean()), 2), 'max': int(sizes.max())}
+        return stats
+
+
+class MicroBatcher:
+    # Collects concurrent single-row requests and scores them with one model call
+    def __init__(self, model, imputation, stats, max_batch_size=64, max_wait_ms=5.0,
+                 calibration=IDENTITY, monitor=None, audit=None):
+        # (model, imputation, calibration, monitor, audit) swapped as one
+        # attribute on hot-reload
+        self.active = (model, imputation, calibration, monitor, audit)
+        self.stats = stats
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def submit(self, record):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((record, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            records = [record for record, _ in batch]
+            active = self.active
+            try:
+                result = await loop.run_in_executor(None, _score, active, records)
+            except Exception:
+                # One malformed record must not fail its neighbours
+                await self._run_individually(batch, active)
+                continue
+            self.stats.record_batch(len(batch))
+            for (_, future), row in zip(batch, result.to_dict('records')):
+                if not future.done():
+                    future.set_result(row)
+
+    async def _run_individually(self, batch, active):
+        loop = asyncio.get_running_loop()
+        for record, future in batch:
+            try:
+                result = await loop.run_in_executor(None, _score, active, [record])
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            self.stats.record_batch(1)
+            if not future.done():
+                future.set_result(result.to_dict('records')[0])
+
+
+class PredictionServer:
+    def __init__(self, model, imputation=None, max_batch_size=64, max_wait_ms=5.0, version=None,
+                 calibration=IDENTITY, monitor=None, audit_log=None):
+        # Audit records carry model.sha256, the hash of the .cbm the model
+        # came from (see load_model)
+        self.audit_log = audit_log
+        audit = audit_log.for_model(model.sha256) if audit_log is not None else None
+        self.active = (model, imputation, calibration, monitor, audit)
+        self.version = version
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(model, imputation, self.stats, max_batch_size, max_wait_ms,
+                                    calibration, monitor, audit)
+
+    def swap(self, loaded, previous=None):
+        # Called from the registry watcher thread. Requests already handed to
+        # the executor finish on the model they started with. Drift is tracked
+        # from scratch against the new version's training profile.
+        audit = self.audit_log.for_model(loaded.model.sha256) if self.audit_log is not None else None
+        self.active = self.batcher.active = (loaded.model, loaded.imputation, loaded.calibration,
+                                             drift_monitor(loaded.path), audit)
+        self.version = loaded.version
+        print(f"🔄 Now serving model {loaded.version}")
+
+    async def predict_one(self, record):
+        if not isinstance(record, dict):
+            raise ValueError("Expected a JSON object with one patient")
+        result = await self.batcher.submit(record)
+        # Values the form could never produce are a bad request, not a score
+        error = result.pop('error')
+        if error:
+            raise ValueError(error)
+        return result
+
+    async def predict_many(self, records):
+        if not isinstance(records, list) or not records:
+            raise ValueError("Expected a non-empty JSON list of patients")
+        if not all(isinstance(record, dict) for record in records):
+            raise ValueError("Expected a JSON object per patient")
+        result = await asyncio.get_running_loop().run_in_executor(None, _score, self.active, records, True)
+        self.stats.record_batch(len(records))
+        return result.drop(columns='error').to_dict('records')
+
+    async def route(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok', 'model_version': self.version}
+        if path == '/stats':
+            return 200, self.stats.snapshot()
+        if path == '/metrics':
+            return 200, METRICS.to_prometheus()
+        if path == '/drift':
+            monitor = self.active[3]
+            if monitor is None:
+                return 404, {'error': "No training profile for the current model"}
+            return 200, monitor.scores()
+        if path in ('/predict', '/predict/batch'):
+            if method != 'POST':
+                return 405, {'error': "Use POST"}
+            try:
+                with timer('request_parsing'):
+                    payload = json.loads(body or b'null')
+                if path == '/predict':
+                    return 200, await self.predict_one(payload)
+                return 200, await self.predict_many(payload)
+            except KeyError as e:
+                return 400, {'error': f"Missing field {e}"}
+            except InvalidRows as e:
+                return 400, {'error': f"{len(e.rows)} invalid patient(s), none were scored",
+                             'rows': [{'index': i, 'error': error} for i, error in e.rows.items()]}
+            except (ValueError, TypeError) as e:
+                return 400, {'error': str(e)}
+        return 404, {'error': f"Unknown path {path}"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length) if length else b''
+
+                start = time.perf_counter()
+                try:
+                    status, payload = await self.route(method, path, body)
+                except Exception as e:
+                    status, payload = 500, {'error': str(e)}
+                if path.startswith('/predict') and status == 200:
+                    latency = time.perf_counter() - start
+                    self.stats.record_latency(latency)
+                    observe('request', latency)
+
+                # /metrics answers in Prometheus text format, everything else in JSON
+                if isinstance(payload, str):
+                    data, content_type = payload.encode(), 'text/plain; version=0.0.4'
+                else:
+                    data, content_type = json.dumps(payload, default=_json_default).encode(), 'application/json'
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"🚀 Serving predictions on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+
+def _json_default(value):
+    # NumPy scalars coming out of the result frame
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP service for survival predictions")
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help="CatBoost model file")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-batch-size', type=int, default=64,
+                        help="Most single-row requests scored together")
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help="Longest a request waits for its micro-batch to fill")
+    parser.add_argument('--registry', metavar='DIR',
+                        help="Serve the registry's current model and hot-reload when it changes")
+    parser.add_argument('--audit-db', metavar='PATH',
+                        help="Append every prediction to this audit log (see audit_log.py)")
+    args = parser.parse_args()
+
+    audit_log = None
+    if args.audit_db:
+        from audit_log import AuditLog
+
+        audit_log = AuditLog(args.audit_db)
+
+    watcher = None
+    if args.registry:
+        from model_registry import ModelRegistry, ModelWatcher
+
+        watcher = ModelWatcher(ModelRegistry(args.registry))
+        if watcher.current is None:
+            parser.error(f"No current model in {args.registry}")
+        loaded = watcher.current
+        server = PredictionServer(loaded.model, loaded.imputation, args.max_batch_size,
+                                  args.max_wait_ms, loaded.version, loaded.calibration,
+                                  drift_monitor(loaded.path), audit_log)
+        watcher.on_swap = server.swap
+        watcher.start()
+    else:
+        server = PredictionServer(load_model(args.model), load_preprocessing(args.model),
+                                  args.max_batch_size, args.max_wait_ms,
+                                  calibration=load_calibration(args.model),
+                                  monitor=drift_monitor(args.model), audit_log=audit_log)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("👋 Server stopped")
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        if audit_log is not None:
+            audit_log.close()
+
+
+if __name__ == "__main__":
+    main()
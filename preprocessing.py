@@ -0,0 +1,174 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from metrics import timer
+from feature_options import (
+    bmi_mapping, cholesterol_mapping, treatment_mapping, gender_options,
+    country_options, cancer_stage_options, smoking_status_options
+)
+
+# Column order the model was trained on
+FEATURE_COLUMNS = [
+    'age', 'gender', 'country', 'cancer_stage', 'family_history',
+    'smoking_status', 'bmi', 'cholesterol_level', 'hypertension', 'asthma',
+    'cirrhosis', 'other_cancer', 'treatment_type',
+    'days_since_diagnosis', 'days_since_end_treatment'
+]
+CATEGORICAL_COLUMNS = ['gender', 'country', 'cancer_stage', 'smoking_status']
+CATEGORY_VALUES = {
+    'gender': gender_options,
+    'country': country_options,
+    'cancer_stage': cancer_stage_options,
+    'smoking_status': smoking_status_options,
+}
+BINARY_COLUMNS = ['family_history', 'hypertension', 'asthma', 'cirrhosis', 'other_cancer']
+MAPPED_COLUMNS = {
+    'bmi': bmi_mapping,
+    'cholesterol_level': cholesterol_mapping,
+    'treatment_type': treatment_mapping,
+}
+DATE_COLUMNS = {
+    'diagnosis_date': 'days_since_diagnosis',
+    'end_treatment_date': 'days_since_end_treatment',
+}
+AGE_RANGE = (0, 120)
+# Message for a value the feature schema can't encode, by column kind
+UNENCODED_MESSAGES = {
+    'category': "unknown {name}",
+    'mapped': "unknown {name}",
+    'numeric': "{name} is not a number",
+    'days_since': "invalid {source}",
+}
+
+
+def encode_features(raw, today=None, schema=None):
+    # Turn raw patient records (same values the GUI form collects) into the
+    # model's feature frame through its feature schema, so training, the
+    # compact store and every scorer share one encoding
+    schema = schema or _default_schema()
+    features = schema.frame(schema.encode_frame(raw, today))
+    features.index = raw.index
+    return features
+
+
+def fit_imputation(raw):
+    # Median for numeric columns, mode for everything else, computed per column
+    raw = raw.drop(columns=['id', 'survived'], errors='ignore')
+    numeric = [col for col in raw.columns if is_numeric_dtype(raw[col])]
+    other = [col for col in raw.columns if col not in numeric]
+    stats = {col: value.item() if hasattr(value, 'item') else value
+             for col, value in raw[numeric].median().items()}
+    if other:
+        stats.update(raw[other].mode().iloc[0].to_dict())
+    return stats
+
+
+def missing_fields(fields, schema):
+    # Raw columns the schema needs that aren't among fields (a frame's
+    # columns or one record's keys). Day counts may be given directly
+    # instead of the dates they come from.
+    return [schema.source(column) for column in schema.columns
+            if column['name'] not in fields and schema.source(column) not in fields]
+
+
+def check_columns(raw, schema):
+    missing = missing_fields(raw.columns, schema)
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+
+def unfilled(arrays, schema):
+    # (column, row mask) for categories still missing after imputation (no
+    # statistics saved, or a mode the schema doesn't know). One such row
+    # makes CatBoost reject the whole call, so the row gets an error instead.
+    return [(name, arrays[name] < 0) for name in schema.categorical if (arrays[name] < 0).any()]
+
+
+def row_errors(raw, arrays, schema, imputed=None):
+    # One message per row ('' when valid), read off the encoded columns and,
+    # when given, the imputed ones. Blank cells are allowed and imputed;
+    # values the GUI form could never produce are not.
+    errors = np.full(len(raw), '', dtype=object)
+
+    def flag(bad, message):
+        if bad.any():
+            errors[bad] = errors[bad] + (message + '; ')
+
+    for column, source, bad in schema.unencoded(raw, arrays):
+        flag(bad, UNENCODED_MESSAGES[column['kind']].format(name=column['name'], source=source))
+    if 'age' in arrays:
+        flag((arrays['age'] < AGE_RANGE[0]) | (arrays['age'] > AGE_RANGE[1]),
+             f"age outside {AGE_RANGE[0]}-{AGE_RANGE[1]}")
+    if {'days_since_diagnosis', 'days_since_end_treatment'} <= arrays.keys():
+        flag(arrays['days_since_end_treatment'] > arrays['days_since_diagnosis'],
+             "end treatment before diagnosis")
+    for name, bad in unfilled(imputed, schema) if imputed is not None else []:
+        flag(bad, f"no value for {name}")
+    flagged = errors != ''
+    errors[flagged] = [message[:-2] for message in errors[flagged]]
+    return pd.Series(errors, index=raw.index)
+
+
+def preprocess(raw, stats=None, today=None, schema=None):
+    # Blank and unknown values are imputed after encoding, so a value the
+    # schema doesn't know is treated like a missing one
+    schema = schema or _default_schema()
+    return _frame(raw, _impute(_encode(raw, today, schema), stats, today, schema), schema)
+
+
+def preprocess_checked(raw, stats=None, today=None, schema=None):
+    # preprocess() plus row_errors() from the same encoded columns; rows with
+    # an error are still encoded, callers decide what to do with them
+    schema = schema or _default_schema()
+    check_columns(raw, schema)
+    arrays = _encode(raw, today, schema)
+    imputed = _impute(dict(arrays), stats, today, schema)
+    with timer('validation'):
+        errors = row_errors(raw, arrays, schema, imputed)
+    return _frame(raw, imputed, schema), errors
+
+
+def _encode(raw, today, schema):
+    with timer('feature_encoding'):
+        return schema.encode_frame(raw, today)
+
+
+def _impute(arrays, stats, today, schema):
+    if stats:
+        with timer('imputation'):
+            arrays = schema.impute(arrays, stats, today)
+    return arrays
+
+
+def _frame(raw, arrays, schema):
+    features = schema.frame(arrays)
+    features.index = raw.index
+    return features
+
+
+def _default_schema():
+    # feature_schema builds its default from the constants above
+    from feature_schema import SCHEMA
+    return SCHEMA
+
+
+def preprocessing_path(model_path):
+    return os.path.splitext(model_path)[0] + '_preprocessing.json'
+
+
+def save_preprocessing(stats, model_path):
+    with open(preprocessing_path(model_path), 'w') as f:
+        json.dump({'imputation': stats}, f, indent=2)
+
+
+def load_preprocessing(model_path):
+    # Models trained before the stats were saved simply skip imputation
+    path = preprocessing_path(model_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)['imputation']
@@ -0,0 +1,57 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from feature_options import (
+    bmi_mapping, cholesterol_mapping, gender_options, country_options,
+    cancer_stage_options, yes_no_options, smoking_status_options,
+    treatment_type_options
+)
+
+
+def make_patients(n_rows, seed=42):
+    # Random patients with the same raw fields as the GUI form and training CSV
+    rng = np.random.default_rng(seed)
+    diagnosis = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3000, n_rows), unit='D')
+    end_treatment = diagnosis + pd.to_timedelta(rng.integers(30, 700, n_rows), unit='D')
+    data = pd.DataFrame({
+        'id': np.arange(1, n_rows + 1),
+        'age': rng.integers(20, 90, n_rows),
+        'gender': rng.choice(gender_options, n_rows),
+        'country': rng.choice(country_options, n_rows),
+        'diagnosis_date': diagnosis.strftime('%Y-%m-%d'),
+        'cancer_stage': rng.choice(cancer_stage_options, n_rows),
+        'family_history': rng.choice(yes_no_options, n_rows),
+        'smoking_status': rng.choice(smoking_status_options, n_rows),
+        'bmi': rng.choice(list(bmi_mapping.keys()), n_rows),
+        'cholesterol_level': rng.choice(list(cholesterol_mapping.keys()), n_rows),
+        'hypertension': rng.choice(yes_no_options, n_rows),
+        'asthma': rng.choice(yes_no_options, n_rows),
+        'cirrhosis': rng.choice(yes_no_options, n_rows),
+        'other_cancer': rng.choice(yes_no_options, n_rows),
+        'treatment_type': rng.choice(treatment_type_options, n_rows),
+        'end_treatment_date': end_treatment.strftime('%Y-%m-%d'),
+    })
+
+    # Survival loosely follows stage and age so models have something to learn
+    stage_risk = data['cancer_stage'].map(
+        {stage: i for i, stage in enumerate(cancer_stage_options)}).to_numpy()
+    logit = 1.5 - 0.8 * stage_risk - 0.02 * (data['age'].to_numpy() - 55)
+    data['survived'] = (rng.random(n_rows) < 1 / (1 + np.exp(-logit))).astype('int8')
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic patient CSV")
+    parser.add_argument('output', help="CSV file to write")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    make_patients(args.rows, args.seed).to_csv(args.output, index=False)
+    print(f"💾 Wrote {args.rows} synthetic patients to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
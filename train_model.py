@@ -1,68 +1,296 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 from catboost import CatBoostClassifier
 import joblib
 
-# 📥 Load Dataset
-data = pd.read_csv('your_dataset.csv')  # <-- Hide real filename
-print("📜 Dataset columns:", data.columns)
+from calibration import IDENTITY, calibration_path, fit_calibration, load_calibration, tune_threshold
+from compact_store import (
+    DEFAULT_CHUNK_SIZE, build_compact_store, holdout_split, peak_memory_mb, stratified_split
+)
+from cross_validation import cross_validate, report, stratified_folds, summarize
+from dataset_cache import DEFAULT_CACHE_DIR, load_or_build
+from drift import PROFILE_ROWS, build_profile, profile_path, save_profile
+from feature_schema import SCHEMA, load_schema
+from incremental_training import file_watermark, load_watermark, read_new_rows, save_watermark
+from metrics import METRICS, timer
+from preprocessing import (
+    CATEGORICAL_COLUMNS, fit_imputation, load_preprocessing, preprocess, save_preprocessing
+)
+
+MODEL_PARAMS = {
+    'iterations': 500,
+    'depth': 6,
+    'learning_rate': 0.1,
+    'loss_function': 'Logloss',
+    'eval_metric': 'Accuracy',
+    'random_seed': 42,
+}
+# Share of an incremental run's new rows held out of the new trees to refit
+# the calibration, and the fewest held-out rows worth fitting it on
+INCREMENTAL_CALIBRATION_SIZE = 0.2
+MIN_CALIBRATION_ROWS = 100
+
+def warn_unknown(counts):
+    # Same report from both loaders: these values are imputed like blanks
+    if counts:
+        listed = ', '.join(f"{name}={count}" for name, count in counts.items())
+        print(f"⚠️ Warning: Unknown values treated as missing: {listed}")
+
+
+def load_in_memory(path):
+    # 📥 Load Dataset
+    data = pd.read_csv(path)
+    print("📜 Dataset columns:", data.columns)
+
+    # 🎯 Check survived values
+    print("🧹 Unique survived values:", data['survived'].unique())
+
+    # 🛡️ Check if survived has NaNs
+    if data['survived'].isnull().sum() > 0:
+        data = data.dropna(subset=['survived'])
+
+    # 🚑 Handle Missing Features (statistics are saved with the model for inference)
+    if data.isnull().values.any():
+        print("⚠️ Warning: Missing values detected! Filling with mode/median.")
+    imputation = fit_imputation(data)
+    warn_unknown(SCHEMA.unknown_counts(data, SCHEMA.encode_frame(data)))
+
+    # 🔥 Features and Labels
+    X = preprocess(data, imputation)
+    y = data['survived']
+
+    print(f"✅ Final Samples for Training: {len(X)}")
+
+    # ✨ Stratified train / holdout split; calibration and test are lists of
+    # frames to score, as in load_out_of_core
+    splits = {name: (X.iloc[rows], y.iloc[rows]) for name, rows in holdout_split(y).items()}
+    for name in ('calibration', 'test'):
+        X_held, y_held = splits[name]
+        splits[name] = ([X_held], y_held)
+    return splits, imputation, build_profile(splits['train'][0])
 
-# 🧩 Categorical Features
-categorical_features = [
-    'gender', 'country', 'diagnosis_date', 'cancer_stage',
-    'family_history', 'smoking_status', 'treatment_type', 'end_treatment_date'
-]
-print("🧩 Categorical Features:", categorical_features)
 
-# 🎯 Check survived values
-print("🧹 Unique survived values:", data['survived'].unique())
+def load_out_of_core(path, chunk_size, cache_dir=None):
+    # 📥 Stream the dataset into compact columns instead of one big DataFrame
+    if cache_dir:
+        store, imputation, hit = load_or_build(path, cache_dir, chunk_size)
+        print(f"🗃️ Dataset cache {'hit' if hit else 'miss'} in {cache_dir}")
+    else:
+        store, imputation = build_compact_store(path, chunk_size)
+    warn_unknown(store.unknown)
+    store.impute(imputation)
+    print(f"📦 Compact store: {len(store)} rows in {store.nbytes / 2 ** 20:.1f} MB")
+    print(f"✅ Final Samples for Training: {len(store)}")
 
-# 🛡️ Check if survived has NaNs
-if data['survived'].isnull().sum() > 0:
+    # ✨ Stratified split on row indices only. Train and eval are pools
+    # CatBoost reads from disk, and carry their labels; calibration and test
+    # are scored a chunk at a time after fitting.
+    rows = holdout_split(store.labels)
+    with tempfile.TemporaryDirectory() as directory:
+        splits = {'train': (store.file_pool(rows['train'], directory, chunk_size), None),
+                  'eval': (store.file_pool(rows['eval'], directory, chunk_size), store.labels[rows['eval']])}
+    for name in ('calibration', 'test'):
+        splits[name] = (store.frames(rows[name], chunk_size), store.labels[rows[name]])
+    # The split is shuffled, so its first rows are a random sample to profile
+    profile = build_profile(store.frame(np.sort(rows['train'][:PROFILE_ROWS])))
+    return splits, imputation, profile
+
+
+def load_new_rows(path, init_model):
+    # 📥 Only the rows appended since the model was last trained
+    watermark = load_watermark(init_model)
+    if watermark is None:
+        raise ValueError(f"No watermark next to {init_model}; run a full training first")
+    data, watermark = read_new_rows(path, watermark)
     data = data.dropna(subset=['survived'])
+    print(f"🆕 New rows since the last run: {len(data)}")
+
+    # 🚑 Keep the previous imputation statistics and feature schema so serving
+    # stays consistent
+    imputation, schema = load_preprocessing(init_model), load_schema(init_model)
+    return preprocess(data, imputation, schema=schema), data['survived'], imputation, schema, watermark
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the lung cancer survival model")
+    parser.add_argument('--data', default='your_dataset.csv', help="Training CSV")  # <-- Hide real filename
+    parser.add_argument('--output', default='model.cbm', help="Where to save the model")  # <-- Hide real filename
+    parser.add_argument('--out-of-core', action='store_true',
+                        help="Stream the CSV in chunks into a compact column store")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Rows per chunk with --out-of-core")
+    parser.add_argument('--dataset-cache', metavar='DIR',
+                        help="Reuse preprocessed columns cached here (implies --out-of-core)")
+    parser.add_argument('--folds', type=int,
+                        help="Evaluate with parallel stratified k-fold CV instead of one holdout split, "
+                             "then train the saved model on every row")
+    parser.add_argument('--workers', type=int, help="Folds trained at the same time with --folds")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="Write stage timings here (.prom for Prometheus text, otherwise JSON)")
+    parser.add_argument('--registry', metavar='DIR',
+                        help="Also publish the model to this registry and make it the current version")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Continue boosting the existing model on rows appended since its last run")
+    parser.add_argument('--init-model', help="Model to continue from with --incremental (default: --output)")
+    parser.add_argument('--iterations', type=int, default=100,
+                        help="Trees added per --incremental run")
+    parser.add_argument('--calibration', choices=['isotonic', 'platt', 'none'], default='isotonic',
+                        help="Map raw probabilities to calibrated ones, fit on held-out predictions")
+    parser.add_argument('--threshold-objective', choices=['accuracy', 'f1', 'youden'], default='accuracy',
+                        help="What the operating threshold on calibrated probabilities maximizes")
+    args = parser.parse_args()
+
+    # 🧩 Categorical Features (dates become day counts, flags and levels become integers)
+    categorical_features = CATEGORICAL_COLUMNS
+    print("🧩 Categorical Features:", categorical_features)
+
+    # 🧠 Initialize CatBoost
+    model = CatBoostClassifier(**MODEL_PARAMS, cat_features=categorical_features, verbose=20)
+    schema = SCHEMA
 
-# 🚑 Handle Missing Features
-if data.isnull().sum().sum() > 0:
-    print("⚠️ Warning: Missing values detected! Filling with mode/median.")
-    for col in data.columns:
-        if data[col].dtype == 'object':
-            data[col] = data[col].fillna(data[col].mode()[0])
+    if args.incremental:
+        init_model = args.init_model or args.output
+        with timer('load_data'):
+            X_new, y_new, imputation, schema, watermark = load_new_rows(args.data, init_model)
+        if X_new.empty:
+            print("✅ No new rows; model left unchanged.")
+            return
+
+        # 📈 Score the new rows with the previous model first, the way they
+        # would have been scored in production
+        previous = CatBoostClassifier()
+        previous.load_model(init_model)
+        rule = load_calibration(init_model)
+        with timer('evaluate'):
+            accuracy = accuracy_score(y_new, rule.decide(rule.apply(previous.predict_proba(X_new)[:, 1])))
+        scores = {'accuracy': accuracy}
+        print(f"✅ Previous model accuracy on new rows: {accuracy:.4f}")
+
+        # 🚀 Add trees on top of the previous model using only the new rows.
+        # The new trees change the raw probabilities, so a slice of the rows
+        # is kept out of them to refit the calibration on.
+        held_out = test = None
+        if (len(y_new) * INCREMENTAL_CALIBRATION_SIZE >= MIN_CALIBRATION_ROWS
+                and y_new.value_counts().reindex([0, 1], fill_value=0).min() >= 2):
+            fit_index, calibration_index = stratified_split(y_new, INCREMENTAL_CALIBRATION_SIZE)
+            X_fit, y_fit = X_new.iloc[fit_index], y_new.iloc[fit_index]
         else:
-            data[col] = data[col].fillna(data[col].median())
+            print(f"⚠️ Warning: {len(y_new)} new rows are too few to refit the calibration; "
+                  f"the model is saved without one (raw probabilities, 0.5 cut).")
+            calibration_index, X_fit, y_fit = None, X_new, y_new
+        model = CatBoostClassifier(**{**MODEL_PARAMS, 'iterations': args.iterations},
+                                   cat_features=schema.categorical, verbose=20)
+        with timer('fit'):
+            model.fit(X_fit, y_fit, init_model=init_model)
+        print(f"🌲 Trees: {previous.tree_count_} -> {model.tree_count_}")
+        if calibration_index is not None:
+            with timer('evaluate'):
+                held_out = (model.predict_proba(X_new.iloc[calibration_index])[:, 1],
+                            y_new.iloc[calibration_index].to_numpy())
+        # The drift profile describes the original training rows and is kept
+        profile = None
+    elif args.folds:
+        # 📈 Evaluate on every fold at once, then 🚀 train on all rows
+        cache_dir = args.dataset_cache or DEFAULT_CACHE_DIR
+        watermark = file_watermark(args.data)
+        start = time.perf_counter()
+        with timer('cross_validation'):
+            results = cross_validate(args.data, MODEL_PARAMS, args.folds, args.workers,
+                                     cache_dir=cache_dir, chunk_size=args.chunk_size)
+        report(results, time.perf_counter() - start)
+        scores = {metric: mean for metric, (mean, _) in summarize(results).items() if metric != 'seconds'}
+        with timer('load_data'):
+            store, imputation, _ = load_or_build(args.data, cache_dir, args.chunk_size)
+            store.impute(imputation)
+            pool = store.pool(quantize=True)
+            sample = np.random.default_rng(42).permutation(len(store))[:PROFILE_ROWS]
+            profile = build_profile(store.frame(np.sort(sample)))
+        out_of_fold = np.empty(len(store))
+        folds = stratified_folds(store.labels, args.folds)
+        for result in results:
+            out_of_fold[folds[result['fold']][1]] = result['probabilities']
+        held_out = (out_of_fold, store.labels)
+        test = None
+        with timer('fit'):
+            model.fit(pool)
+    else:
+        watermark = file_watermark(args.data)
+        with timer('load_data'):
+            if args.out_of_core or args.dataset_cache:
+                splits, imputation, profile = load_out_of_core(args.data, args.chunk_size, args.dataset_cache)
+            else:
+                splits, imputation, profile = load_in_memory(args.data)
+        # Loading is where the two paths differ; fitting costs about the same in both
+        peak = peak_memory_mb()
+        if peak is not None:
+            print(f"📊 Peak memory after loading: {peak:.0f} MB")
 
-# 🔥 Features and Labels
-X = data.drop(['id', 'survived'], axis=1)
-y = data['survived']
+        # 🚀 Train, keeping the best iteration on the eval slice
+        (X_train, y_train), (X_eval, y_eval) = splits['train'], splits['eval']
+        with timer('fit'):
+            model.fit(X_train, y_train, eval_set=(X_eval, y_eval) if y_train is not None else X_eval)
 
-print(f"✅ Final Samples for Training: {len(X)}")
+        with timer('evaluate'):
+            held_out, test = [(np.concatenate([model.predict_proba(X)[:, 1] for X in frames]), np.asarray(y))
+                              for frames, y in (splits['calibration'], splits['test'])]
+        scores = {}
 
-# ✨ Train-Test Split
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
+    # 🎚️ Calibrate on held-out predictions and pick the operating threshold
+    calibration = None
+    if held_out is not None and args.calibration != 'none':
+        with timer('calibration_fit'):
+            probabilities, labels = held_out
+            calibration = fit_calibration(probabilities, labels, args.calibration)
+            calibration.threshold = tune_threshold(calibration.apply(probabilities), labels,
+                                                   args.threshold_objective)
+        scores['threshold'] = calibration.threshold
+        print(f"🎚️ {args.calibration} calibration, threshold {calibration.threshold:.3f} "
+              f"(best {args.threshold_objective})")
 
-# 🧠 Initialize CatBoost
-model = CatBoostClassifier(
-    iterations=500,
-    depth=6,
-    learning_rate=0.1,
-    loss_function='Logloss',
-    eval_metric='Accuracy',
-    random_seed=42,
-    cat_features=categorical_features,
-    verbose=20
-)
+    # 📈 Evaluate on the untouched test split with the rule that is deployed:
+    # calibrated probabilities against the tuned threshold
+    if test is not None:
+        rule = calibration or IDENTITY
+        probabilities, labels = test
+        scores['accuracy'] = accuracy_score(labels, rule.decide(rule.apply(probabilities)))
+        print(f"✅ Final Test Accuracy: {scores['accuracy']:.4f} (threshold {rule.threshold:.3f})")
+
+    # 💾 Save
+    with timer('save'):
+        model.save_model(args.output)
+        save_preprocessing(imputation, args.output)
+        schema.save(args.output)
+        save_watermark(watermark, args.output)
+        if calibration is not None:
+            calibration.save(args.output)
+        elif os.path.exists(calibration_path(args.output)):
+            # Don't leave a calibration fit for a previous model behind
+            os.remove(calibration_path(args.output))
+        if profile is not None:
+            save_profile(profile, args.output)
+        if args.incremental and init_model != args.output and os.path.exists(profile_path(init_model)):
+            shutil.copyfile(profile_path(init_model), profile_path(args.output))
+    print("💾 Model saved successfully.")
+    if args.registry:
+        from model_registry import ModelRegistry
+
+        version = ModelRegistry(args.registry).publish(args.output, scores, MODEL_PARAMS)
+        print(f"🗂️ Published as {version} in {args.registry}")
 
-# 🚀 Train
-model.fit(X_train, y_train, eval_set=(X_test, y_test))
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"📊 Peak memory: {peak:.0f} MB")
+    METRICS.report()
+    if args.metrics:
+        METRICS.export(args.metrics)
 
-# 📈 Evaluate
-y_pred = model.predict(X_test)
-accuracy = accuracy_score(y_test, y_pred)
-print(f"✅ Final Test Accuracy: {accuracy:.4f}")
 
-# 💾 Save
-model.save_model('model.cbm')  # <-- Hide real filename
-print("💾 Model saved successfully.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import tkinter as tk
+from tkinter import ttk
+
+VISIBLE_ROWS = 25
+
+
+class VirtualTable(ttk.Frame):
+    # A Treeview with a fixed set of rows whose cells are refilled as the
+    # user scrolls, so only the visible slice of the frame is ever formatted.
+    # Sorting reorders an index array; the frame itself is never copied.
+    def __init__(self, parent, columns, formatters=None, height=VISIBLE_ROWS):
+        super().__init__(parent)
+        self.columns = columns
+        self.formatters = formatters or {}
+        self.height = height
+        self.frame = None
+        self.order = []
+        self.top = 0
+        self.sort_column = None
+        self.ascending = True
+
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', height=height,
+                                 selectmode='browse')
+        for name in columns:
+            self.tree.heading(name, text=name.replace('_', ' ').title(),
+                              command=lambda name=name: self.sort_by(name))
+            self.tree.column(name, width=120, anchor=tk.W, stretch=True)
+        self.rows = [self.tree.insert('', 'end', values=()) for _ in range(height)]
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind('<MouseWheel>', lambda event: self.scroll(-1 if event.delta > 0 else 1, 'units'))
+        self.tree.bind('<Button-4>', lambda event: self.scroll(-1, 'units'))
+        self.tree.bind('<Button-5>', lambda event: self.scroll(1, 'units'))
+        self.tree.bind('<Prior>', lambda event: self.scroll(-1, 'pages'))
+        self.tree.bind('<Next>', lambda event: self.scroll(1, 'pages'))
+
+    def set_frame(self, frame):
+        self.frame = frame.reset_index(drop=True)
+        self.order = self.frame.index.to_numpy()
+        self.top = 0
+        self.sort_column = None
+        self.refresh()
+
+    def ordered(self):
+        # The frame in the order currently shown (for export)
+        return self.frame.iloc[self.order]
+
+    def sort_by(self, name):
+        if self.frame is None:
+            return
+        self.ascending = not self.ascending if self.sort_column == name else True
+        self.sort_column = name
+        try:
+            ordered = self.frame.sort_values(name, ascending=self.ascending, kind='stable',
+                                             na_position='last')
+        except TypeError:
+            # Mixed types (e.g. a non-numeric age in an imported file) sort as text
+            ordered = self.frame.sort_values(name, ascending=self.ascending, kind='stable',
+                                             na_position='last', key=lambda values: values.astype(str))
+        self.order = ordered.index.to_numpy()
+        for column in self.columns:
+            arrow = (' ▲' if self.ascending else ' ▼') if column == name else ''
+            self.tree.heading(column, text=column.replace('_', ' ').title() + arrow)
+        self.top = 0
+        self.refresh()
+
+    def scroll(self, amount, what):
+        step = self.height if what == 'pages' else 3
+        self.move_to(self.top + int(amount) * step)
+        return 'break'
+
+    def on_scrollbar(self, action, amount, what=None):
+        if action == 'moveto':
+            self.move_to(int(float(amount) * len(self.order)))
+        else:
+            self.scroll(amount, what)
+
+    def move_to(self, top):
+        self.top = max(0, min(top, len(self.order) - self.height))
+        self.refresh()
+
+    def refresh(self):
+        total = len(self.order)
+        visible = self.frame.iloc[self.order[self.top:self.top + self.height]] if total else None
+        for i, item in enumerate(self.rows):
+            if visible is not None and i < len(visible):
+                row = visible.iloc[i]
+                self.tree.item(item, values=[self.format(name, row[name]) for name in self.columns])
+            else:
+                self.tree.item(item, values=())
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.height) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def format(self, name, value):
+        if value is None or value != value:  # None or NaN
+            return ''
+        formatter = self.formatters.get(name)
+        return formatter(value) if formatter else str(value)